@@ -0,0 +1,175 @@
+"""Cached access to the notification configuration file."""
+import json
+import os
+import tempfile
+import threading
+
+import yaml
+
+
+class FrozenDict(dict):
+    """Read-only dict used for shared configuration snapshots."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Configuration snapshots are read-only, use thaw() to get a copy")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value):
+    """Return a read-only deep copy of a parsed configuration value."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Return a mutable deep copy of a configuration snapshot."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigLoadError(Exception):
+    """Raised when an existing config file cannot be read or parsed."""
+
+
+def parse_config(path, f):
+    """Parse a config file as JSON or YAML depending on its extension."""
+    if path.endswith(".json"):
+        return json.load(f)
+    return yaml.safe_load(f)
+
+
+def dump_config(path, config, f):
+    """Write a config file as JSON or YAML depending on its extension."""
+    if path.endswith(".json"):
+        json.dump(config, f, indent=2, sort_keys=True)
+    else:
+        yaml.dump(config, f, default_flow_style=False)
+
+
+class ConfigStore:
+    """Parse the config file once and serve it until the file changes.
+
+    Every get() compares the file's modification time and size with the
+    values recorded when the snapshot was parsed, so edits made outside the
+    add-on are picked up on the next request. save() replaces the file
+    atomically and updates the snapshot directly, and update() runs a whole
+    read-modify-write under the store's lock so concurrent writers cannot
+    lose each other's changes. update() never writes a config it could not
+    load, so a typo in a hand-edited file is not replaced by the defaults.
+    Files ending in .json are stored as JSON, anything else as YAML.
+    """
+
+    def __init__(self, path, default):
+        self.path = path
+        self._default = freeze(default)
+        self._snapshot = None
+        self._signature = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _replace(self, config, signature):
+        self._snapshot = freeze(config)
+        self._signature = signature
+        self.reloads += 1
+
+    def _load(self):
+        """Return the current snapshot, raising if the file cannot be loaded."""
+        signature = self._file_signature()
+        if self._snapshot is not None and signature == self._signature:
+            self.hits += 1
+            return self._snapshot
+
+        with self._lock:
+            signature = self._file_signature()
+            if self._snapshot is not None and signature == self._signature:
+                self.hits += 1
+                return self._snapshot
+
+            self.misses += 1
+            with open(self.path, "r") as f:
+                config = parse_config(self.path, f) or {}
+            self._replace(config, signature)
+            return self._snapshot
+
+    def get(self):
+        """Return the current read-only configuration snapshot."""
+        try:
+            return self._load()
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            # Return a default config if file can't be loaded
+            return self._default
+
+    def save(self, config):
+        """Atomically write the configuration and make it the current snapshot."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, temp_path = tempfile.mkstemp(
+                dir=directory,
+                prefix=f".{os.path.basename(self.path)}.",
+                suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    dump_config(self.path, thaw(config), f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            self._replace(config, self._file_signature())
+
+    def update(self, mutate):
+        """Apply mutate(config) to a copy of the current config and save it.
+
+        Returns whatever mutate returns. If mutate raises or returns False,
+        nothing is saved. A missing file starts from the default config; one
+        that exists but cannot be loaded raises ConfigLoadError.
+        """
+        with self._lock:
+            try:
+                snapshot = self._load()
+            except FileNotFoundError:
+                snapshot = self._default
+            except Exception as e:
+                raise ConfigLoadError(f"Could not load {self.path}: {e}") from e
+            config = thaw(snapshot)
+            result = mutate(config)
+            if result is not False:
+                self.save(config)
+            return result
+
+    def export_yaml(self):
+        """Return the current configuration as YAML text."""
+        return yaml.dump(thaw(self.get()), default_flow_style=False)
+
+    def stats(self):
+        """Return cache counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "loaded": self._snapshot is not None
+        }
@@ -0,0 +1,109 @@
+"""Bounded, expiring store of recently sent notifications."""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def _key_value(value):
+    """Return a hashable, order-stable form of a payload value."""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, default=str)
+
+
+def make_dedup_key(payload, person=None, fields=None, ignore_message=False):
+    """Build the deduplication key for a notification payload.
+
+    Only the selected fields are used (all of them when fields is empty),
+    and the message body can be left out so that repeated alerts with a
+    changing message still count as duplicates. With a person the key
+    identifies that person's copy of the notification; otherwise the
+    audience is compared as a set. The key is reduced with Python's
+    built-in hash, which is fast and only has to be stable within the
+    running process.
+    """
+    names = fields or sorted(payload)
+    parts = []
+    for name in names:
+        if name == "audience" or (ignore_message and name == "message"):
+            continue
+        parts.append((name, _key_value(payload.get(name))))
+
+    if person is not None:
+        parts.append(("person", person))
+    else:
+        audience = payload.get("audience", [])
+        if isinstance(audience, str):
+            audience = [audience]
+        parts.append(("audience", frozenset(_key_value(member) for member in audience)))
+
+    return hash(tuple(parts))
+
+
+class DedupStore:
+    """Remember message keys for a TTL with a hard cap on the number of entries.
+
+    Entries are kept in insertion order, which is also expiry order because
+    every entry has the same TTL. Expired entries are pruned from the front
+    on each write, and the oldest entries are evicted once max_entries is
+    reached.
+    """
+
+    def __init__(self, ttl=300, max_entries=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _prune(self, now):
+        while self._entries:
+            key, sent_at = next(iter(self._entries.items()))
+            if now - sent_at < self.ttl:
+                break
+            del self._entries[key]
+            self.expired += 1
+
+    def check_and_add(self, key):
+        """Record key as sent and return True, or return False if it is a duplicate."""
+        now = self._clock()
+        with self._lock:
+            sent_at = self._entries.get(key)
+            if sent_at is not None and now - sent_at < self.ttl:
+                self.hits += 1
+                return False
+
+            self._entries.pop(key, None)
+            self._prune(now)
+            while len(self._entries) >= self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+            self._entries[key] = now
+            return True
+
+    def discard(self, key):
+        """Forget a key so it can be sent again."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return size and eviction counters."""
+        with self._lock:
+            self._prune(self._clock())
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "duplicates": self.hits,
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
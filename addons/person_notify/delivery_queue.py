@@ -0,0 +1,105 @@
+"""Background delivery queue for notifications accepted with a 202 response."""
+import contextvars
+import itertools
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class DeliveryQueue:
+    """Drain routed deliveries on worker threads and remember their outcome.
+
+    Each notification is one job. Jobs are taken in priority order (the
+    severity rank from the dispatcher), oldest first within a priority.
+    Workers hand the job's deliveries to ``dispatch(deliveries)``, normally
+    the dispatcher, so its concurrency limits and severity budgets still
+    apply. The status of the most recent
+    ``max_statuses`` notifications is kept for the /notify/<id> endpoint.
+    """
+
+    def __init__(self, dispatch, workers=2, max_statuses=1000, on_complete=None):
+        self._dispatch = dispatch
+        self._on_complete = on_complete
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._statuses = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_statuses = max(1, int(max_statuses))
+        self._workers = []
+        for index in range(max(1, int(workers))):
+            worker = threading.Thread(
+                target=self._run,
+                name=f"notify-queue-{index}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _store(self, notification_id, status):
+        with self._lock:
+            self._statuses[notification_id] = status
+            self._statuses.move_to_end(notification_id)
+            while len(self._statuses) > self.max_statuses:
+                self._statuses.popitem(last=False)
+
+    def _update(self, notification_id, **changes):
+        with self._lock:
+            status = self._statuses.get(notification_id)
+            if status is not None:
+                status.update(changes)
+
+    def submit(self, deliveries, duplicates=(), priority=0, context=None):
+        """Queue deliveries for one notification and return its ID.
+
+        ``context`` is passed back to on_complete(results, context). The job
+        runs in a copy of the caller's context variables.
+        """
+        notification_id = uuid.uuid4().hex
+        self._store(notification_id, {
+            "id": notification_id,
+            "status": "queued",
+            "queued_at": time.time(),
+            "pending": len(deliveries),
+            "delivered": 0,
+            "duplicates": list(duplicates),
+            "results": []
+        })
+        self._queue.put((
+            -priority, next(self._sequence), notification_id, deliveries, context,
+            contextvars.copy_context()
+        ))
+        return notification_id
+
+    def get(self, notification_id):
+        """Return a copy of a notification's status, or None if unknown."""
+        with self._lock:
+            status = self._statuses.get(notification_id)
+            return dict(status) if status is not None else None
+
+    def _run(self):
+        while True:
+            _, _, notification_id, deliveries, context, variables = self._queue.get()
+            try:
+                self._update(notification_id, status="sending")
+                results = variables.run(self._dispatch, deliveries)
+                if self._on_complete:
+                    variables.run(self._on_complete, results, context)
+                self._update(
+                    notification_id,
+                    status="done",
+                    finished_at=time.time(),
+                    pending=0,
+                    delivered=sum(1 for result in results if result["status"] == "sent"),
+                    results=results
+                )
+            except Exception as e:
+                print(f"Error delivering queued notification {notification_id}: {e}")
+                self._update(notification_id, status="error", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def size(self):
+        """Return the number of notifications waiting for a worker."""
+        return self._queue.qsize()
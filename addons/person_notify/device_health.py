@@ -0,0 +1,107 @@
+"""Per-device delivery health and circuit breaking."""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DeviceHealth:
+    """Track how each notify target behaves and stop calling broken ones.
+
+    Every delivery outcome updates the device's success and failure counts,
+    an exponentially weighted success rate and latency. After
+    ``failure_threshold`` consecutive failures the device's circuit opens
+    and allow() refuses it for ``cooldown`` seconds. The first delivery
+    after the cooldown is let through as a probe: success closes the
+    circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60, alpha=0.2, clock=time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._clock = clock
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def _device(self, device):
+        state = self._devices.get(device)
+        if state is None:
+            state = self._devices[device] = {
+                "state": CLOSED,
+                "successes": 0,
+                "failures": 0,
+                "short_circuited": 0,
+                "consecutive_failures": 0,
+                "success_rate": 1.0,
+                "latency_ms": None,
+                "open_until": None,
+                "last_failure": None
+            }
+        return state
+
+    def allow(self, device):
+        """Return whether a delivery to the device should be attempted now."""
+        with self._lock:
+            state = self._device(device)
+            if state["state"] == CLOSED:
+                return True
+            if state["state"] == OPEN and self._clock() >= state["open_until"]:
+                # Let one delivery through to find out whether it recovered
+                state["state"] = HALF_OPEN
+                return True
+            state["short_circuited"] += 1
+            return False
+
+    def retry_at(self, device):
+        """Return the Unix time at which an open circuit lets a probe through, or None."""
+        with self._lock:
+            state = self._devices.get(device)
+            if state is None or state["state"] != OPEN:
+                return None
+            return time.time() + max(0, state["open_until"] - self._clock())
+
+    def record(self, device, success, elapsed_ms):
+        """Update a device's health with the outcome of one delivery."""
+        with self._lock:
+            state = self._device(device)
+            state["success_rate"] += self.alpha * ((1.0 if success else 0.0) - state["success_rate"])
+            if state["latency_ms"] is None:
+                state["latency_ms"] = elapsed_ms
+            else:
+                state["latency_ms"] += self.alpha * (elapsed_ms - state["latency_ms"])
+
+            if success:
+                state["successes"] += 1
+                state["consecutive_failures"] = 0
+                if state["state"] != CLOSED:
+                    print(f"Circuit for {device} closed, device recovered")
+                state["state"] = CLOSED
+                state["open_until"] = None
+                return
+
+            state["failures"] += 1
+            state["consecutive_failures"] += 1
+            state["last_failure"] = time.time()
+            if state["state"] == HALF_OPEN or state["consecutive_failures"] >= self.failure_threshold:
+                if state["state"] != OPEN:
+                    print(f"Circuit for {device} opened after {state['consecutive_failures']} failures")
+                state["state"] = OPEN
+                state["open_until"] = self._clock() + self.cooldown
+
+    def snapshot(self):
+        """Return the health of every device seen so far."""
+        now = self._clock()
+        with self._lock:
+            devices = {}
+            for device, state in self._devices.items():
+                entry = dict(state)
+                entry["success_rate"] = round(entry["success_rate"], 3)
+                if entry["latency_ms"] is not None:
+                    entry["latency_ms"] = round(entry["latency_ms"], 1)
+                open_until = entry.pop("open_until")
+                entry["retry_in"] = round(max(0, open_until - now), 1) if open_until else None
+                devices[device] = entry
+            return devices
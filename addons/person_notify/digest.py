@@ -0,0 +1,91 @@
+"""Per-person digest buffers for bursts of low severity notifications."""
+import threading
+import time
+
+
+class DigestBuffer:
+    """Collect notifications per (person, severity) and flush them as one.
+
+    A buffer is flushed ``max_delay`` seconds after its first notification
+    arrived, or as soon as it holds ``max_batch`` notifications. Due buffers
+    are handed together to ``flush(batches)`` on a background thread, where
+    each batch is a dict with the person, severity, latest targets and the
+    buffered (title, message) items.
+    """
+
+    def __init__(self, flush, clock=time.monotonic):
+        self._flush = flush
+        self._clock = clock
+        self._buffers = {}
+        self._condition = threading.Condition()
+        self.flushed_batches = 0
+        self.flushed_items = 0
+        self._thread = threading.Thread(target=self._run, name="notify-digest", daemon=True)
+        self._thread.start()
+
+    def add(self, person, severity, targets, title, message, max_delay, max_batch):
+        """Buffer a notification for a person until its digest is due."""
+        now = self._clock()
+        with self._condition:
+            key = (person, severity)
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = {
+                    "person": person,
+                    "severity": severity,
+                    "items": [],
+                    "due": now + max_delay
+                }
+                self._buffers[key] = buffer
+            buffer["targets"] = targets
+            buffer["items"].append((title, message))
+            if len(buffer["items"]) >= max_batch:
+                buffer["due"] = now
+            self._condition.notify()
+
+    def _take_due(self, now, force=False):
+        due = [
+            key for key, buffer in self._buffers.items()
+            if force or buffer["due"] <= now
+        ]
+        return [self._buffers.pop(key) for key in due]
+
+    def _send(self, batches):
+        if not batches:
+            return
+        self.flushed_batches += len(batches)
+        self.flushed_items += sum(len(batch["items"]) for batch in batches)
+        try:
+            self._flush(batches)
+        except Exception as e:
+            print(f"Error sending digest notifications: {e}")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = self._clock()
+                batches = self._take_due(now)
+                while not batches:
+                    timeout = None
+                    if self._buffers:
+                        timeout = max(0, min(b["due"] for b in self._buffers.values()) - now)
+                    self._condition.wait(timeout)
+                    now = self._clock()
+                    batches = self._take_due(now)
+            self._send(batches)
+
+    def flush_all(self):
+        """Send every buffered digest immediately."""
+        with self._condition:
+            batches = self._take_due(self._clock(), force=True)
+        self._send(batches)
+
+    def stats(self):
+        """Return buffered and flushed counts."""
+        with self._condition:
+            return {
+                "buffers": len(self._buffers),
+                "buffered_items": sum(len(b["items"]) for b in self._buffers.values()),
+                "flushed_batches": self.flushed_batches,
+                "flushed_items": self.flushed_items
+            }
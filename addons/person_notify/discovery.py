@@ -0,0 +1,82 @@
+"""Cached discovery of Home Assistant people and notify services."""
+import hashlib
+import json
+import threading
+import time
+
+
+class DiscoveryCache:
+    """Serve a discovered value for a TTL and refresh it in the background.
+
+    The first get() fetches synchronously. After that, a get() on a stale
+    value returns the stale value immediately and starts one background
+    refresh, so page loads never wait on the Home Assistant API. A failed
+    fetch keeps the previous value and is retried on the next get().
+    """
+
+    def __init__(self, name, fetch, ttl=300, clock=time.monotonic):
+        self.name = name
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._value = None
+        self._etag = None
+        self._fetched_at = None
+        self.hits = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _refresh(self):
+        try:
+            value = self._fetch()
+        except Exception as e:
+            print(f"Error refreshing {self.name}: {e}")
+            self.errors += 1
+            with self._lock:
+                self._refreshing = False
+            return
+        etag = hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:20]
+        with self._lock:
+            self._value = value
+            self._etag = etag
+            self._fetched_at = self._clock()
+            self._refreshing = False
+            self.refreshes += 1
+
+    def get(self):
+        """Return the cached (value, etag), or (None, None) if never fetched."""
+        with self._lock:
+            loaded = self._fetched_at is not None
+            stale = not loaded or self._clock() - self._fetched_at >= self.ttl
+            start_refresh = stale and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+            elif loaded:
+                self.hits += 1
+
+        if start_refresh:
+            if loaded:
+                threading.Thread(target=self._refresh, name=f"refresh-{self.name}", daemon=True).start()
+            else:
+                self._refresh()
+
+        with self._lock:
+            return self._value, self._etag
+
+    def invalidate(self):
+        """Force a refresh on the next get()."""
+        with self._lock:
+            if self._fetched_at is not None:
+                self._fetched_at = self._clock() - self.ttl
+
+    def stats(self):
+        """Return cache counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "age": None if self._fetched_at is None else round(self._clock() - self._fetched_at, 1)
+            }
@@ -0,0 +1,212 @@
+"""Concurrent delivery of notifications to Home Assistant notify services."""
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+DEFAULT_SEVERITY_LEVELS = ("info", "warning", "critical")
+
+
+class DeliveryError(Exception):
+    """Raised by ``send`` to fail a delivery with its cause.
+
+    ``unconfirmed`` marks a call that reached Home Assistant but was not
+    answered, so the notification may still have been delivered.
+    """
+
+    def __init__(self, message, unconfirmed=False):
+        super().__init__(message)
+        self.unconfirmed = unconfirmed
+
+
+class DeliveryDispatcher:
+    """Send device deliveries in parallel with bounded, severity-aware concurrency.
+
+    A fixed set of worker threads is the global limit on in-flight service
+    calls. Waiting deliveries are kept per severity and workers always take
+    the highest severity first, using the order of ``severity_levels``
+    (lowest to highest). Every severity also has its own in-flight budget,
+    which by default grows with its rank, so a burst of low severity
+    messages always leaves workers free for critical alerts. Each call to
+    dispatch() additionally keeps at most ``per_request_limit`` of its own
+    deliveries in flight. When a ``health`` tracker is given, deliveries to
+    devices whose circuit is open are skipped without calling ``send``; their
+    results carry ``retry_at``, the Unix time at which the device is probed
+    again, or None while a probe is already under way.
+    ``send`` returns whether the delivery succeeded or raises DeliveryError;
+    failed results carry the cause as ``error`` and unanswered calls get
+    the status ``unconfirmed``.
+    ``send`` runs in a copy of the caller's context, so context variables
+    such as the current trace are visible to it.
+    """
+
+    def __init__(self, send, max_workers=16, per_request_limit=8,
+                 severity_levels=DEFAULT_SEVERITY_LEVELS, severity_limits=None, health=None):
+        self._send = send
+        self.health = health
+        self.max_workers = max(1, int(max_workers))
+        self.per_request_limit = max(1, int(per_request_limit))
+        self._configured_limits = dict(severity_limits or {})
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._in_flight = {}
+        self._running = True
+        self.set_severity_levels(severity_levels)
+
+        self._workers = []
+        for index in range(self.max_workers):
+            worker = threading.Thread(
+                target=self._run,
+                name=f"notify-dispatch-{index}",
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def set_severity_levels(self, severity_levels):
+        """Set the severity order used for priorities and default budgets."""
+        levels = tuple(severity_levels or DEFAULT_SEVERITY_LEVELS)
+        if getattr(self, "severity_levels", None) == levels:
+            return
+        with self._condition:
+            self.severity_levels = levels
+            self._ranks = {severity: rank for rank, severity in enumerate(levels)}
+            self._limits = {}
+            for rank, severity in enumerate(levels):
+                default = math.ceil(self.max_workers * (rank + 1) / len(levels))
+                limit = self._configured_limits.get(severity, default)
+                self._limits[severity] = max(1, min(int(limit), self.max_workers))
+            self._condition.notify_all()
+
+    def priority(self, severity):
+        """Return the scheduling priority of a severity, higher is more urgent."""
+        return self._ranks.get(severity, -1)
+
+    def limit(self, severity):
+        """Return the in-flight budget of a severity."""
+        return self._limits.get(severity, self._limits[self.severity_levels[0]])
+
+    def _deliver(self, delivery):
+        """Send a single delivery and describe the outcome."""
+        device = delivery["device"]
+        if self.health is not None and not self.health.allow(device):
+            return {
+                "person": delivery["person"],
+                "device": device,
+                "status": "skipped",
+                "error": "circuit open",
+                "retry_at": self.health.retry_at(device),
+                "elapsed_ms": 0.0
+            }
+
+        start = time.monotonic()
+        status = "failed"
+        error = None
+        try:
+            if self._send(delivery):
+                status = "sent"
+            else:
+                error = "service call failed"
+        except DeliveryError as e:
+            error = str(e)
+            if e.unconfirmed:
+                status = "unconfirmed"
+        except Exception as e:
+            print(f"Error delivering to {device}: {e}")
+            error = str(e)
+        elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+        if self.health is not None:
+            self.health.record(device, status == "sent", elapsed_ms)
+        result = {
+            "person": delivery["person"],
+            "device": device,
+            "status": status,
+            "elapsed_ms": elapsed_ms
+        }
+        if error is not None:
+            result["error"] = error
+        return result
+
+    def _next_task(self):
+        """Pick the most urgent waiting delivery whose severity has budget left."""
+        for severity in sorted(self._pending, key=self.priority, reverse=True):
+            tasks = self._pending[severity]
+            if tasks and self._in_flight.get(severity, 0) < self.limit(severity):
+                return severity, tasks.popleft()
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                severity, task = self._next_task()
+                while task is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    severity, task = self._next_task()
+                self._in_flight[severity] = self._in_flight.get(severity, 0) + 1
+
+            delivery, future, context = task
+            try:
+                future.set_result(context.run(self._deliver, delivery))
+            finally:
+                with self._condition:
+                    self._in_flight[severity] -= 1
+                    self._condition.notify_all()
+
+    def _submit(self, delivery):
+        future = Future()
+        severity = delivery.get("severity")
+        with self._condition:
+            self._pending.setdefault(severity, deque()).append(
+                (delivery, future, contextvars.copy_context())
+            )
+            self._condition.notify()
+        return future
+
+    def dispatch(self, deliveries, limit=None):
+        """Send all deliveries and return their results in the same order."""
+        deliveries = list(deliveries)
+        if not deliveries:
+            return []
+
+        limit = min(limit or self.per_request_limit, self.max_workers)
+        results = [None] * len(deliveries)
+        pending = {}
+        next_index = 0
+
+        while next_index < len(deliveries) or pending:
+            while next_index < len(deliveries) and len(pending) < limit:
+                future = self._submit(deliveries[next_index])
+                pending[future] = next_index
+                next_index += 1
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+
+        return results
+
+    def stats(self):
+        """Return waiting and in-flight deliveries per severity."""
+        with self._condition:
+            return {
+                str(severity): {
+                    "priority": self.priority(severity),
+                    "limit": self.limit(severity),
+                    "waiting": len(self._pending.get(severity, ())),
+                    "in_flight": self._in_flight.get(severity, 0)
+                }
+                for severity in set(self.severity_levels) | set(self._pending)
+            }
+
+    def shutdown(self, wait_for_pending=True):
+        """Stop the worker threads once the waiting deliveries are sent."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if wait_for_pending:
+            for worker in self._workers:
+                worker.join()
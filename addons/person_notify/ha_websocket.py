@@ -0,0 +1,283 @@
+"""Persistent connection to the Home Assistant WebSocket API."""
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import websocket
+
+
+class NotConnectedError(ConnectionError):
+    """Raised when a request could not be sent because the socket is down."""
+
+
+class ServiceCallError(Exception):
+    """Raised when Home Assistant answers a service call with an error."""
+
+
+class HomeAssistantWebSocket:
+    """Follow people and notify services and call services over one socket.
+
+    After authenticating, the client loads the current states and services
+    once. It keeps its people up to date with a subscribe_entities
+    subscription limited to the known person entities, so other entities'
+    updates are never sent, and with entity_registry_updated events for
+    people being added, renamed or removed. service_registered and
+    service_removed events keep the notify services up to date.
+    on_people_changed(people) and on_services_changed(services) are
+    called whenever those sets change. When nothing arrives for
+    ``ping_interval`` seconds the client pings Home Assistant, and a ping
+    that goes unanswered until the next interval is taken as a dead
+    connection. The connection is re-established with backoff when it
+    drops.
+    """
+
+    def __init__(self, url, token, on_people_changed=None, on_services_changed=None,
+                 request_timeout=10, ping_interval=30):
+        self.url = url
+        self.token = token
+        self.request_timeout = request_timeout
+        self.ping_interval = ping_interval
+        self._on_people_changed = on_people_changed
+        self._on_services_changed = on_services_changed
+        self._ws = None
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._ping = None
+        self._people_subscription = None
+        self._followed_people = None
+        self._running = False
+        self.connected = False
+        self.people = set()
+        self.notify_services = set()
+        self.reconnects = 0
+
+    def start(self):
+        """Connect in a background thread and keep the connection alive."""
+        self._running = True
+        threading.Thread(target=self._run, name="ha-websocket", daemon=True).start()
+
+    def stop(self):
+        """Close the connection and stop reconnecting."""
+        self._running = False
+        if self._ws is not None:
+            self._ws.close()
+
+    def _send(self, message):
+        with self._send_lock:
+            self._ws.send(json.dumps(message))
+
+    def _request(self, message):
+        if not self.connected:
+            raise NotConnectedError("Home Assistant WebSocket is not connected")
+        message_id = next(self._ids)
+        future = Future()
+        self._pending[message_id] = future
+        try:
+            self._send(dict(message, id=message_id))
+        except Exception as e:
+            self._pending.pop(message_id, None)
+            raise NotConnectedError(f"Could not send to Home Assistant WebSocket: {e}")
+        return message_id, future
+
+    def request(self, message):
+        """Send a command and return a Future for its result message."""
+        return self._request(message)[1]
+
+    def call_service(self, domain, service, data):
+        """Call a Home Assistant service, raising ServiceCallError if it fails.
+
+        A call that is not answered within ``request_timeout`` raises
+        TimeoutError. Only that call is given up on: a slow notify target
+        must not fail the other calls sharing the connection, whose
+        liveness is checked by the keepalive ping instead.
+        """
+        message_id, future = self._request({
+            "type": "call_service",
+            "domain": domain,
+            "service": service,
+            "service_data": data
+        })
+        try:
+            result = future.result(timeout=self.request_timeout)
+        except FutureTimeoutError:
+            self._pending.pop(message_id, None)
+            raise TimeoutError(f"Home Assistant did not answer {domain}.{service} in time")
+        if not result.get("success"):
+            error = result.get("error") or {}
+            raise ServiceCallError(error.get("message") or error.get("code") or "service call failed")
+        return True
+
+    def _keepalive(self):
+        """Ping Home Assistant after a quiet interval; fail if the last ping went unanswered."""
+        if self._ping is not None and not self._ping.done():
+            raise ConnectionError(f"no answer to a ping within {self.ping_interval}s")
+        self._ping = self.request({"type": "ping"})
+
+    def _authenticate(self):
+        message = json.loads(self._ws.recv())
+        if message.get("type") == "auth_required":
+            self._ws.send(json.dumps({"type": "auth", "access_token": self.token}))
+            message = json.loads(self._ws.recv())
+        if message.get("type") != "auth_ok":
+            raise ConnectionError(f"Home Assistant WebSocket authentication failed: {message}")
+
+    def _subscribe(self):
+        """Subscribe to events and request the initial states and services."""
+        self._people_subscription = None
+        self._followed_people = None
+        for event_type in ("entity_registry_updated", "service_registered", "service_removed"):
+            self.request({"type": "subscribe_events", "event_type": event_type})
+        self.request({"type": "get_states"}).add_done_callback(self._load_states)
+        self.request({"type": "get_services"}).add_done_callback(self._load_services)
+
+    def _load_states(self, future):
+        if future.exception() is not None:
+            return
+        states = future.result().get("result") or []
+        self._set_people({
+            state["entity_id"].split(".", 1)[1]
+            for state in states
+            if state["entity_id"].startswith("person.")
+        })
+
+    def _load_services(self, future):
+        if future.exception() is not None:
+            return
+        services = future.result().get("result") or {}
+        self._set_notify_services({
+            f"notify.{service}" for service in services.get("notify", {})
+        })
+
+    def _follow_people(self, people):
+        """Subscribe to the states of exactly these person entities."""
+        if self._people_subscription is not None:
+            self.request({"type": "unsubscribe_events", "subscription": self._people_subscription})
+            self._people_subscription = None
+        self._followed_people = people
+        # Without entity_ids Home Assistant would send every entity's updates
+        if people:
+            self._people_subscription, _ = self._request({
+                "type": "subscribe_entities",
+                "entity_ids": sorted(f"person.{person}" for person in people)
+            })
+
+    def _set_people(self, people):
+        if self.connected and people != self._followed_people:
+            self._follow_people(people)
+        if people == self.people:
+            return
+        self.people = people
+        if self._on_people_changed:
+            try:
+                self._on_people_changed(sorted(people))
+            except Exception as e:
+                print(f"Error handling people update: {e}")
+
+    def _set_notify_services(self, services):
+        if services == self.notify_services:
+            return
+        self.notify_services = services
+        if self._on_services_changed:
+            try:
+                self._on_services_changed(sorted(services))
+            except Exception as e:
+                print(f"Error handling notify service update: {e}")
+
+    def _handle_people_states(self, event):
+        """Apply a subscribe_entities update: added states and removed entities."""
+        people = set(self.people)
+        for entity_id in event.get("a", {}):
+            people.add(entity_id.split(".", 1)[1])
+        for entity_id in event.get("r", []):
+            people.discard(entity_id.split(".", 1)[1])
+        self._set_people(people)
+
+    def _handle_event(self, event):
+        event_type = event.get("event_type")
+        data = event.get("data", {})
+        if event_type == "entity_registry_updated":
+            entity_id = data.get("entity_id", "")
+            old_entity_id = data.get("old_entity_id", "")
+            if not (entity_id.startswith("person.") or old_entity_id.startswith("person.")):
+                return
+            people = set(self.people)
+            # A rename removes the old entity ID
+            if old_entity_id.startswith("person."):
+                people.discard(old_entity_id.split(".", 1)[1])
+            if entity_id.startswith("person."):
+                person = entity_id.split(".", 1)[1]
+                if data.get("action") == "remove":
+                    people.discard(person)
+                else:
+                    people.add(person)
+            self._set_people(people)
+        elif data.get("domain") == "notify":
+            service = f"notify.{data.get('service')}"
+            if event_type == "service_registered":
+                self._set_notify_services(self.notify_services | {service})
+            elif event_type == "service_removed":
+                self._set_notify_services(self.notify_services - {service})
+
+    def _handle_message(self, message):
+        if message.get("type") == "event":
+            if self._people_subscription is not None and message.get("id") == self._people_subscription:
+                self._handle_people_states(message.get("event", {}))
+            else:
+                self._handle_event(message.get("event", {}))
+            return
+        future = self._pending.pop(message.get("id"), None)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _fail_pending(self, error):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _run(self):
+        delay = 1
+        while self._running:
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=self.request_timeout)
+                self._authenticate()
+                # Wake up regularly so a silent, half-open socket is noticed
+                self._ws.settimeout(self.ping_interval)
+                self._ping = None
+                self.connected = True
+                delay = 1
+                print(f"Connected to Home Assistant WebSocket API at {self.url}")
+                self._subscribe()
+                while self._running:
+                    try:
+                        message = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        self._keepalive()
+                        continue
+                    self._handle_message(json.loads(message))
+            except Exception as e:
+                if self._running:
+                    print(f"Home Assistant WebSocket connection lost: {e}")
+            finally:
+                self.connected = False
+                self._fail_pending(ConnectionError("Home Assistant WebSocket disconnected"))
+                if self._ws is not None:
+                    self._ws.close()
+            if self._running:
+                self.reconnects += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def stats(self):
+        """Return the connection state."""
+        return {
+            "connected": self.connected,
+            "url": self.url,
+            "people": len(self.people),
+            "notify_services": len(self.notify_services),
+            "reconnects": self.reconnects,
+            "pending_requests": len(self._pending)
+        }
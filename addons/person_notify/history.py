@@ -0,0 +1,168 @@
+"""Append-only notification history stored in SQLite."""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    person TEXT NOT NULL,
+    severity TEXT,
+    title TEXT,
+    message TEXT,
+    status TEXT NOT NULL,
+    preference TEXT,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL,
+    payload TEXT,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications (created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_person ON notifications (person, created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_severity ON notifications (severity, created_at);
+"""
+
+COLUMNS = (
+    "created_at", "person", "severity", "title", "message", "status",
+    "preference", "delivered", "latency_ms", "payload", "results"
+)
+
+
+class NotificationHistory:
+    """Record one row per notified person without blocking the request path.
+
+    record() only puts the entry on a queue. A writer thread inserts queued
+    entries in batches of up to ``batch_size`` rows, at least every
+    ``flush_interval`` seconds, and once an hour deletes rows older than
+    ``retention_days`` and releases the freed pages.
+    """
+
+    def __init__(self, path, retention_days=30, batch_size=200, flush_interval=1.0):
+        self.path = path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self.written = 0
+        self.pruned = 0
+
+        # The connection's own context manager only commits, closing() closes it
+        with closing(self._connect()) as db, db:
+            # Only takes effect on a new database; lets pruning return space to the OS
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            db.executescript(SCHEMA)
+        threading.Thread(target=self._run, name="notify-history", daemon=True).start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _reader(self):
+        # One connection per thread; WAL lets readers run alongside the writer
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def record(self, person, severity, title, message, status, preference=None,
+               delivered=0, latency_ms=None, payload=None, results=None):
+        """Queue a history entry for one person."""
+        self._queue.put((
+            time.time(), person, severity, title, message, status, preference,
+            delivered, latency_ms,
+            json.dumps(payload, default=str) if payload is not None else None,
+            json.dumps(results, default=str) if results is not None else None
+        ))
+
+    def _write(self, db, rows):
+        with db:
+            db.executemany(
+                f"INSERT INTO notifications ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                rows
+            )
+        self.written += len(rows)
+
+    def _prune(self, db):
+        cutoff = time.time() - self.retention_days * 86400
+        with db:
+            deleted = db.execute("DELETE FROM notifications WHERE created_at < ?", (cutoff,)).rowcount
+        if deleted:
+            self.pruned += deleted
+            db.execute("PRAGMA incremental_vacuum")
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _run(self):
+        db = self._connect()
+        next_prune = 0
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(db, rows)
+                if time.monotonic() >= next_prune:
+                    self._prune(db)
+                    next_prune = time.monotonic() + 3600
+            except Exception as e:
+                print(f"Error writing notification history: {e}")
+
+    def query(self, person=None, severity=None, status=None, since=None, until=None,
+              before_id=None, limit=50):
+        """Return history entries, newest first, and the cursor for the next page."""
+        conditions = []
+        params = []
+        for column, value in (("person", person), ("severity", severity), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._reader().execute(
+            f"SELECT * FROM notifications {where} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        items = []
+        for row in rows[:limit]:
+            item = dict(row)
+            for field in ("payload", "results"):
+                if item[field] is not None:
+                    item[field] = json.loads(item[field])
+            items.append(item)
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return items, next_cursor
+
+    def stats(self):
+        """Return write counters and the number of entries waiting to be written."""
+        return {
+            "path": self.path,
+            "retention_days": self.retention_days,
+            "written": self.written,
+            "pruned": self.pruned,
+            "pending": self._queue.qsize()
+        }
@@ -1,686 +1,127 @@
-import time
+import atexit
+import functools
+import hmac
 import json
-import yaml
-import hashlib
 import os
-import requests
-from flask import Flask, request, jsonify, render_template_string, redirect, url_for, Response, session
+import time
+from contextlib import contextmanager
+from flask import Flask, request, jsonify, redirect, url_for, Response, session
+from requests.exceptions import ReadTimeout
+
+from config_store import ConfigLoadError, ConfigStore
+from dedup import DedupStore, make_dedup_key
+from device_health import DeviceHealth
+from delivery_queue import DeliveryQueue
+from digest import DigestBuffer
+from discovery import DiscoveryCache
+from history import NotificationHistory
+from metrics import (
+    DEDUP_ENTRIES, DELIVERIES, REQUESTS, SERVICE_CALL_SECONDS, STAGE_SECONDS,
+    SUPERVISOR_REQUESTS, render_metrics
+)
+from outbox import Outbox
+from profiling import CpuProfiler, MemoryProfiler
+from ha_websocket import HomeAssistantWebSocket, NotConnectedError
+from mqtt_ingest import MqttIngest
+from dispatcher import DeliveryDispatcher, DeliveryError
+from routing import RoutingCache, SILENT_PREFERENCES
+from supervisor import SupervisorClient
+from tracing import Tracer, current_trace, span
+from ui_assets import build_ui
 
 CONFIG_FILE = "notification_config.yaml"
+CONFIG_JSON_FILE = "notification_config.json"
+# Overridable so the add-on can be run locally, e.g. against benchmarks/mock_supervisor.py
+OPTIONS_FILE = os.environ.get("OPTIONS_FILE", "/data/options.json")
 DEDUPLICATION_TTL = 300  # seconds
-SENT_MESSAGES = {}
+
+def load_options():
+    """Load the add-on options written by the Supervisor."""
+    try:
+        with open(OPTIONS_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+OPTIONS = load_options()
+CONFIG_FORMAT = OPTIONS.get("config_format", "yaml")
+MAX_CONCURRENT_DELIVERIES = int(OPTIONS.get("max_concurrent_deliveries", 16))
+MAX_DELIVERIES_PER_REQUEST = int(OPTIONS.get("max_deliveries_per_request", 8))
+SUPERVISOR_CONNECT_TIMEOUT = float(OPTIONS.get("supervisor_connect_timeout", 3))
+SUPERVISOR_READ_TIMEOUT = float(OPTIONS.get("supervisor_read_timeout", 10))
+SUPERVISOR_RETRIES = int(OPTIONS.get("supervisor_retries", 3))
+USE_WEBSOCKET = bool(OPTIONS.get("use_websocket", True))
+MQTT_ENABLED = bool(OPTIONS.get("mqtt_enabled", False))
+MQTT_HOST = OPTIONS.get("mqtt_host", "core-mosquitto")
+MQTT_PORT = int(OPTIONS.get("mqtt_port", 1883))
+MQTT_USERNAME = OPTIONS.get("mqtt_username", "")
+MQTT_PASSWORD = OPTIONS.get("mqtt_password", "")
+MQTT_TOPIC = OPTIONS.get("mqtt_topic", "person_notify/notify")
+MQTT_RESULT_TOPIC = OPTIONS.get("mqtt_result_topic", "")
+MQTT_QOS = int(OPTIONS.get("mqtt_qos", 1))
+CIRCUIT_FAILURE_THRESHOLD = int(OPTIONS.get("circuit_failure_threshold", 5))
+CIRCUIT_COOLDOWN = int(OPTIONS.get("circuit_cooldown", 60))
+HISTORY_ENABLED = bool(OPTIONS.get("history_enabled", True))
+HISTORY_RETENTION_DAYS = int(OPTIONS.get("history_retention_days", 30))
+HISTORY_FILE = "/data/notification_history.db" if os.path.isdir("/data") else "notification_history.db"
+TRACE_BUFFER_SIZE = int(OPTIONS.get("trace_buffer_size", 200))
+TRACE_EXPORT_FILE = OPTIONS.get("trace_export_file") or None
+DEBUG_ADMIN_TOKEN = OPTIONS.get("debug_admin_token", "")
+OUTBOX_ENABLED = bool(OPTIONS.get("outbox_enabled", True))
+OUTBOX_MAX_ATTEMPTS = {
+    entry["severity"]: int(entry["attempts"])
+    for entry in OPTIONS.get("outbox_max_attempts", [])
+}
+OUTBOX_FILE = "/data/outbox.db" if os.path.isdir("/data") else "outbox.db"
+DISCOVERY_TTL = int(OPTIONS.get("discovery_ttl", 300))
+QUEUED_DELIVERY = bool(OPTIONS.get("queued_delivery", False))
+QUEUE_WORKERS = int(OPTIONS.get("queue_workers", 2))
+SERVER = OPTIONS.get("server", "waitress")
+SERVER_THREADS = int(OPTIONS.get("server_threads", 8))
+SERVER_CONNECTION_LIMIT = int(OPTIONS.get("server_connection_limit", 100))
+SEVERITY_CONCURRENCY = {
+    entry["severity"]: int(entry["limit"])
+    for entry in OPTIONS.get("severity_concurrency", [])
+}
+DEDUPLICATION_MAX_ENTRIES = int(OPTIONS.get("dedup_max_entries", 10000))
+DEDUPLICATION_FIELDS = list(OPTIONS.get("dedup_fields", []))
+DEDUPLICATION_IGNORE_MESSAGE = bool(OPTIONS.get("dedup_ignore_message", False))
+
+sent_messages = DedupStore(ttl=DEDUPLICATION_TTL, max_entries=DEDUPLICATION_MAX_ENTRIES)
+DEDUP_ENTRIES.set_function(lambda: sent_messages.stats()["size"])
 
 # Check if running in Home Assistant add-on
 INGRESS_PATH = os.environ.get('INGRESS_PATH', '')
 SUPERVISOR_TOKEN = os.environ.get('SUPERVISOR_TOKEN', '')
+SUPERVISOR_API = OPTIONS.get("supervisor_url", "http://supervisor/core/api").rstrip("/")
+# Home Assistant serves the WebSocket API next to the REST API
+SUPERVISOR_WEBSOCKET = OPTIONS.get("supervisor_websocket_url") or (
+    "ws" + SUPERVISOR_API[len("http"):].rsplit("/api", 1)[0] + "/websocket"
+)
+PORT = int(os.environ.get("PORT", 8732))
+
+def count_supervisor_request(method, path, status):
+    """Count a Supervisor API request by endpoint and outcome."""
+    endpoint = path.strip("/").split("/")[0]
+    outcome = "ok" if status is not None and status < 400 else "error"
+    SUPERVISOR_REQUESTS.labels(method, endpoint, outcome).inc()
 
-app = Flask(__name__)
+supervisor = SupervisorClient(
+    SUPERVISOR_API,
+    SUPERVISOR_TOKEN,
+    pool_size=MAX_CONCURRENT_DELIVERIES,
+    connect_timeout=SUPERVISOR_CONNECT_TIMEOUT,
+    read_timeout=SUPERVISOR_READ_TIMEOUT,
+    retries=SUPERVISOR_RETRIES,
+    on_request=count_supervisor_request
+)
+
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.urandom(24)  # For session management
 
-# Main web UI template with CSS and JavaScript
-MAIN_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Person-Based Notification System</title>
-    <style>
-        body { 
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; 
-            line-height: 1.6;
-            color: #333;
-            max-width: 1200px; 
-            margin: 0 auto; 
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        h1, h2, h3 { color: #03a9f4; }
-        .card {
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            padding: 20px;
-            margin-bottom: 20px;
-        }
-        .tabs {
-            display: flex;
-            margin-bottom: 20px;
-            border-bottom: 1px solid #ddd;
-        }
-        .tab {
-            padding: 10px 20px;
-            cursor: pointer;
-            border: 1px solid transparent;
-            margin-bottom: -1px;
-        }
-        .tab.active {
-            border: 1px solid #ddd;
-            border-bottom-color: white;
-            background: white;
-            border-top-left-radius: 4px;
-            border-top-right-radius: 4px;
-        }
-        .tab-content {
-            display: none;
-        }
-        .tab-content.active {
-            display: block;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        table, th, td {
-            border: 1px solid #ddd;
-        }
-        th, td {
-            padding: 12px;
-            text-align: left;
-        }
-        th {
-            background-color: #f2f2f2;
-        }
-        select, input, button {
-            padding: 8px 12px;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-            font-size: 14px;
-        }
-        button {
-            background-color: #03a9f4;
-            color: white;
-            border: none;
-            cursor: pointer;
-            transition: background-color 0.3s;
-        }
-        button:hover {
-            background-color: #0288d1;
-        }
-        .form-group {
-            margin-bottom: 15px;
-        }
-        .form-group label {
-            display: block;
-            margin-bottom: 5px;
-            font-weight: bold;
-        }
-        .device-list {
-            list-style-type: none;
-            padding: 0;
-        }
-        .device-item {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 8px 0;
-            border-bottom: 1px solid #eee;
-        }
-        .badge {
-            display: inline-block;
-            padding: 3px 7px;
-            border-radius: 4px;
-            font-size: 12px;
-            font-weight: bold;
-        }
-        .badge-info { background-color: #e8f5e9; color: #2e7d32; }
-        .badge-warning { background-color: #fff8e1; color: #ff8f00; }
-        .badge-critical { background-color: #ffebee; color: #c62828; }
-        .status-message {
-            padding: 10px;
-            margin: 10px 0;
-            border-radius: 4px;
-        }
-        .status-success { background-color: #e8f5e9; color: #2e7d32; }
-        .status-error { background-color: #ffebee; color: #c62828; }
-        .hidden { display: none; }
-        .user-info {
-            font-size: 18px;
-            font-weight: bold;
-            margin-bottom: 20px;
-            background-color: #e3f2fd;
-            padding: 10px;
-            border-radius: 4px;
-        }
-        .user-select {
-            margin-top: 20px;
-            margin-bottom: 20px;
-            padding: 15px;
-            background-color: #fffde7;
-            border-radius: 4px;
-            border: 1px solid #ffd600;
-        }
-    </style>
-</head>
-<body>
-    <h1>Person-Based Notification System</h1>
-    
-    <div class="user-info" id="user-info">
-        <!-- Current user will be displayed here -->
-    </div>
-    
-    <div id="user-select" class="user-select hidden">
-        <p>Please select which user's preferences you want to manage:</p>
-        <select id="select-user">
-            <!-- Populated by JavaScript -->
-        </select>
-        <button id="confirm-user-btn">Confirm</button>
-    </div>
-    
-    <div class="tabs">
-        <div class="tab active" data-tab="preferences">Notification Preferences</div>
-        <div class="tab" data-tab="devices">Device Management</div>
-        <div class="tab" data-tab="test">Test Notifications</div>
-        <div class="tab" data-tab="api">API Documentation</div>
-    </div>
-    
-    <div id="status-message" class="status-message hidden"></div>
-    
-    <div id="preferences" class="tab-content active">
-        <div class="card">
-            <h2>Your Notification Preferences</h2>
-            <p>Configure how you receive notifications based on severity level.</p>
-            
-            <table>
-                <thead>
-                    <tr>
-                        <th>Severity</th>
-                        <th>Notification Preference</th>
-                    </tr>
-                </thead>
-                <tbody id="preferences-table">
-                    <!-- Populated by JavaScript -->
-                </tbody>
-            </table>
-        </div>
-    </div>
-    
-    <div id="devices" class="tab-content">
-        <div class="card">
-            <h2>Device Management</h2>
-            <p>Manage your notification devices.</p>
-            
-            <h3>Your Devices</h3>
-            <div id="device-lists">
-                <div>
-                    <h4>All Devices</h4>
-                    <ul id="all-devices-list" class="device-list">
-                        <!-- Populated by JavaScript -->
-                    </ul>
-                    <div class="form-group">
-                        <select id="add-all-device">
-                            <!-- Populated by JavaScript with available notification services -->
-                        </select>
-                        <button id="add-all-device-btn">Add Device</button>
-                    </div>
-                </div>
-                
-                <div>
-                    <h4>Mobile Devices</h4>
-                    <ul id="mobile-devices-list" class="device-list">
-                        <!-- Populated by JavaScript -->
-                    </ul>
-                    <div class="form-group">
-                        <select id="add-mobile-device">
-                            <!-- Populated by JavaScript with available notification services -->
-                        </select>
-                        <button id="add-mobile-device-btn">Add Device</button>
-                    </div>
-                </div>
-                
-                <div>
-                    <h4>Desktop Devices</h4>
-                    <ul id="desktop-devices-list" class="device-list">
-                        <!-- Populated by JavaScript -->
-                    </ul>
-                    <div class="form-group">
-                        <select id="add-desktop-device">
-                            <!-- Populated by JavaScript with available notification services -->
-                        </select>
-                        <button id="add-desktop-device-btn">Add Device</button>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-    
-    <div id="test" class="tab-content">
-        <div class="card">
-            <h2>Test Notifications</h2>
-            <p>Send test notifications to verify your configuration.</p>
-            
-            <div class="form-group">
-                <label for="test-severity">Severity Level:</label>
-                <select id="test-severity">
-                    <option value="info">Info</option>
-                    <option value="warning">Warning</option>
-                    <option value="critical">Critical</option>
-                </select>
-            </div>
-            
-            <div class="form-group">
-                <label for="test-title">Notification Title:</label>
-                <input type="text" id="test-title" value="Test Notification">
-            </div>
-            
-            <div class="form-group">
-                <label for="test-message">Message:</label>
-                <input type="text" id="test-message" value="This is a test notification">
-            </div>
-            
-            <button id="send-test-btn">Send Test Notification</button>
-        </div>
-    </div>
-    
-    <div id="api" class="tab-content">
-        <div class="card">
-            <h2>API Documentation</h2>
-            <p>Send notifications using a POST request to <code>/notify</code> with the following JSON payload:</p>
-            <pre>
-{
-  "title": "Notification Title",
-  "message": "Notification message content",
-  "severity": "critical", // critical, warning, or info
-  "audience": ["jeremy", "sarah"] // List of people to notify
-}
-            </pre>
-            
-            <h3>Example with curl</h3>
-            <pre>
-curl -X POST http://your-homeassistant:8732/notify \\
-  -H "Content-Type: application/json" \\
-  -d '{
-    "title": "Water Leak",
-    "message": "Water leak detected in basement",
-    "severity": "critical",
-    "audience": ["jeremy"]
-  }'
-            </pre>
-        </div>
-    </div>
-
-    <script>
-        // Load configuration data
-        let config = {};
-        let currentUser = '';
-        let availableNotifyServices = [];
-        let haPeople = [];
-        
-        // Initialize the UI
-        document.addEventListener('DOMContentLoaded', function() {
-            // Tab switching
-            document.querySelectorAll('.tab').forEach(tab => {
-                tab.addEventListener('click', function() {
-                    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
-                    document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
-                    
-                    this.classList.add('active');
-                    document.getElementById(this.dataset.tab).classList.add('active');
-                });
-            });
-            
-            // Fetch Home Assistant people
-            fetchHaPeople();
-            
-            // Set up event listeners
-            document.getElementById('confirm-user-btn').addEventListener('click', selectUser);
-            document.getElementById('add-all-device-btn').addEventListener('click', () => addDevice('all'));
-            document.getElementById('add-mobile-device-btn').addEventListener('click', () => addDevice('mobile'));
-            document.getElementById('add-desktop-device-btn').addEventListener('click', () => addDevice('desktop'));
-            document.getElementById('send-test-btn').addEventListener('click', sendTestNotification);
-            
-            // Fetch notification services
-            fetchNotifyServices();
-        });
-        
-        // Fetch Home Assistant people
-        function fetchHaPeople() {
-            fetch(window.location.pathname + 'ha_people')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP error! Status: ${response.status}`);
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    haPeople = data.people;
-                    fetchCurrentUser();
-                })
-                .catch(error => {
-                    showStatusMessage('Error loading Home Assistant people: ' + error.message, 'error');
-                    console.error('Error loading people:', error);
-                });
-        }
-        
-        // Fetch current user
-        function fetchCurrentUser() {
-            fetch(window.location.pathname + 'current_user')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP error! Status: ${response.status}`);
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    if (data.user && data.user !== 'unknown') {
-                        // We have a valid user
-                        currentUser = data.user;
-                        document.getElementById('user-info').textContent = `Signed in as: ${currentUser}`;
-                        document.getElementById('user-select').classList.add('hidden');
-                    } else {
-                        // We need to ask the user to select a person
-                        showUserSelect();
-                    }
-                    
-                    // Load config after getting current user
-                    fetchConfig();
-                })
-                .catch(error => {
-                    showStatusMessage('Error determining current user: ' + error.message, 'error');
-                    console.error('Error loading user:', error);
-                    showUserSelect();
-                });
-        }
-        
-        // Show user selection UI
-        function showUserSelect() {
-            const select = document.getElementById('select-user');
-            select.innerHTML = '';
-            
-            haPeople.forEach(person => {
-                const option = document.createElement('option');
-                option.value = person;
-                option.textContent = person;
-                select.appendChild(option);
-            });
-            
-            document.getElementById('user-select').classList.remove('hidden');
-        }
-        
-        // Handle user selection
-        function selectUser() {
-            const select = document.getElementById('select-user');
-            currentUser = select.value;
-            
-            // Set the user via API
-            fetch(window.location.pathname + 'set_user', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ user: currentUser })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.status === 'ok') {
-                    document.getElementById('user-info').textContent = `Signed in as: ${currentUser}`;
-                    document.getElementById('user-select').classList.add('hidden');
-                    fetchConfig();
-                } else {
-                    showStatusMessage(`Error: ${data.message}`, 'error');
-                }
-            })
-            .catch(error => {
-                showStatusMessage('Error setting user: ' + error.message, 'error');
-            });
-        }
-        
-        // Fetch notification services
-        function fetchNotifyServices() {
-            fetch(window.location.pathname + 'ha_services')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP error! Status: ${response.status}`);
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    availableNotifyServices = data.services;
-                    updateDeviceSelects();
-                })
-                .catch(error => {
-                    showStatusMessage('Error loading notification services: ' + error.message, 'error');
-                    console.error('Error loading services:', error);
-                });
-        }
-        
-        // Update device select dropdowns
-        function updateDeviceSelects() {
-            const deviceSelects = [
-                document.getElementById('add-all-device'),
-                document.getElementById('add-mobile-device'),
-                document.getElementById('add-desktop-device')
-            ];
-            
-            deviceSelects.forEach(select => {
-                select.innerHTML = '';
-                
-                availableNotifyServices.forEach(service => {
-                    const option = document.createElement('option');
-                    option.value = service;
-                    option.textContent = service;
-                    select.appendChild(option);
-                });
-            });
-        }
-        
-        // Fetch configuration
-        function fetchConfig() {
-            fetch(window.location.pathname + 'config')
-                .then(response => {
-                    if (!response.ok) {
-                        throw new Error(`HTTP error! Status: ${response.status}`);
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    config = data;
-                    updatePreferencesTable();
-                    loadDevicesForUser();
-                })
-                .catch(error => {
-                    showStatusMessage('Error loading configuration: ' + error.message, 'error');
-                    console.error('Error loading configuration:', error);
-                });
-        }
-        
-        // Update the preferences table for current user
-        function updatePreferencesTable() {
-            const tbody = document.getElementById('preferences-table');
-            tbody.innerHTML = '';
-            
-            if (!currentUser || !config.audiences || !config.audiences[currentUser]) return;
-            
-            const preferenceOptions = ['All Devices', 'Mobile Only', 'Desktop Only', 'Log Only', 'None'];
-            const severities = ['critical', 'warning', 'info'];
-            
-            severities.forEach(severity => {
-                const row = document.createElement('tr');
-                
-                // Severity name
-                const nameCell = document.createElement('td');
-                nameCell.textContent = severity.charAt(0).toUpperCase() + severity.slice(1);
-                row.appendChild(nameCell);
-                
-                // Preference select
-                const prefCell = document.createElement('td');
-                const select = document.createElement('select');
-                select.id = `${currentUser}-${severity}`;
-                
-                preferenceOptions.forEach(option => {
-                    const optEl = document.createElement('option');
-                    optEl.value = option.replace(' ', '_').toLowerCase();
-                    optEl.textContent = option;
-                    select.appendChild(optEl);
-                });
-                
-                // Set current value
-                const currentPref = config.audiences[currentUser][severity + '_notification'] || 'none';
-                select.value = currentPref;
-                
-                select.addEventListener('change', () => updatePreference(currentUser, severity, select.value));
-                
-                prefCell.appendChild(select);
-                row.appendChild(prefCell);
-                
-                tbody.appendChild(row);
-            });
-        }
-        
-        // Load devices for current user
-        function loadDevicesForUser() {
-            if (!currentUser || !config.audiences || !config.audiences[currentUser]) return;
-            
-            const personConfig = config.audiences[currentUser];
-            
-            // Update device lists
-            updateDeviceList('all', personConfig.devices?.all || []);
-            updateDeviceList('mobile', personConfig.devices?.mobile || []);
-            updateDeviceList('desktop', personConfig.devices?.desktop || []);
-        }
-        
-        // Update a device list
-        function updateDeviceList(type, devices) {
-            const list = document.getElementById(`${type}-devices-list`);
-            list.innerHTML = '';
-            
-            devices.forEach(device => {
-                const li = document.createElement('li');
-                li.className = 'device-item';
-                
-                const deviceName = document.createElement('span');
-                deviceName.textContent = device;
-                
-                const deleteBtn = document.createElement('button');
-                deleteBtn.textContent = 'Remove';
-                deleteBtn.addEventListener('click', () => removeDevice(type, device));
-                
-                li.appendChild(deviceName);
-                li.appendChild(deleteBtn);
-                list.appendChild(li);
-            });
-        }
-        
-        // Update notification preference
-        function updatePreference(person, severity, value) {
-            config.audiences[person][severity + '_notification'] = value;
-            saveConfig();
-        }
-        
-        // Add a device
-        function addDevice(type) {
-            const select = document.getElementById(`add-${type}-device`);
-            const device = select.value;
-            
-            if (!device) {
-                showStatusMessage(`Please select a notification service`, 'error');
-                return;
-            }
-            
-            if (!currentUser || !config.audiences[currentUser]) return;
-            
-            // Initialize devices object if it doesn't exist
-            if (!config.audiences[currentUser].devices) {
-                config.audiences[currentUser].devices = { all: [], mobile: [], desktop: [] };
-            }
-            
-            // Add to list if not already present
-            if (!config.audiences[currentUser].devices[type].includes(device)) {
-                config.audiences[currentUser].devices[type].push(device);
-                saveConfig();
-            }
-        }
-        
-        // Remove a device
-        function removeDevice(type, device) {
-            if (!currentUser || !config.audiences[currentUser]) return;
-            
-            const devices = config.audiences[currentUser].devices[type];
-            const index = devices.indexOf(device);
-            
-            if (index !== -1) {
-                devices.splice(index, 1);
-                saveConfig();
-            }
-        }
-        
-        // Save configuration
-        function saveConfig() {
-            fetch(window.location.pathname + 'config', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(config)
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.status === 'ok') {
-                    showStatusMessage('Configuration saved successfully', 'success');
-                    fetchConfig(); // Reload config
-                } else {
-                    showStatusMessage(`Error: ${data.message}`, 'error');
-                }
-            })
-            .catch(error => {
-                showStatusMessage('Error saving configuration: ' + error.message, 'error');
-            });
-        }
-        
-        // Send a test notification
-        function sendTestNotification() {
-            const severity = document.getElementById('test-severity').value;
-            const title = document.getElementById('test-title').value;
-            const message = document.getElementById('test-message').value;
-            
-            if (!currentUser || !title || !message) {
-                showStatusMessage('Please fill in all fields', 'error');
-                return;
-            }
-            
-            fetch(window.location.pathname + 'notify', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    title: title,
-                    message: message,
-                    severity: severity,
-                    audience: [currentUser]
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.status === 'ok') {
-                    showStatusMessage(`Test notification sent to ${currentUser}`, 'success');
-                } else {
-                    showStatusMessage(`Error: ${data.message}`, 'error');
-                }
-            })
-            .catch(error => {
-                showStatusMessage('Error sending notification: ' + error.message, 'error');
-            });
-        }
-        
-        // Show status message
-        function showStatusMessage(message, type) {
-            const statusEl = document.getElementById('status-message');
-            statusEl.textContent = message;
-            statusEl.className = `status-message status-${type}`;
-            
-            // Show message
-            statusEl.classList.remove('hidden');
-            
-            // Hide after 5 seconds
-            setTimeout(() => {
-                statusEl.classList.add('hidden');
-            }, 5000);
-        }
-    </script>
-</body>
-</html>
-"""
+# The page and its CSS and JavaScript are built once; assets get content-hashed names
+UI_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui")
+ui_page, ui_assets = build_ui(UI_DIRECTORY, app.jinja_env)
 
 def get_current_user_from_request(request):
     """Determine the current user from the request."""
@@ -696,99 +137,240 @@ def get_current_user_from_request(request):
     # If we still don't have a user, return unknown
     return "unknown"
 
+# Rendered by Home Assistant so only person entities are sent back
+PEOPLE_TEMPLATE = "{{ states.person | map(attribute='entity_id') | list | tojson }}"
+
+def fetch_ha_people():
+    """Fetch people entities from Home Assistant, raising on failure."""
+    # The WebSocket connection already follows every person entity
+    if ha_websocket.connected and ha_websocket.people:
+        return sorted(ha_websocket.people)
+
+    response = supervisor.post("/template", {"template": PEOPLE_TEMPLATE})
+    if response.ok:
+        entity_ids = json.loads(response.text)
+    else:
+        # Fall back to scanning every state
+        response = supervisor.get("/states")
+        response.raise_for_status()
+        entity_ids = [state["entity_id"] for state in response.json()]
+    return [
+        entity_id.split(".")[1]
+        for entity_id in entity_ids
+        if entity_id.startswith("person.")
+    ]
+
 def get_ha_people():
     """Get people entities from Home Assistant."""
     try:
-        response = requests.get(
-            "http://supervisor/core/api/states",
-            headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"}
-        )
-        if response.ok:
-            states = response.json()
-            people = [
-                state["entity_id"].split(".")[1] 
-                for state in states 
-                if state["entity_id"].startswith("person.")
-            ]
-            return people
-        return []
+        return fetch_ha_people()
     except Exception as e:
         print(f"Error fetching people: {e}")
         return []
 
+def fetch_ha_notify_services():
+    """Fetch notification services from Home Assistant, raising on failure."""
+    if ha_websocket.connected and ha_websocket.notify_services:
+        return sorted(ha_websocket.notify_services)
+
+    response = supervisor.get("/services")
+    response.raise_for_status()
+    notify_services = []
+    for domain in response.json():
+        if domain["domain"] == "notify":
+            notify_services.extend([
+                f"notify.{service}" for service in domain["services"]
+            ])
+    return notify_services
+
 def get_ha_notify_services():
     """Get available notification services from Home Assistant."""
     try:
-        response = requests.get(
-            "http://supervisor/core/api/services",
-            headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"}
-        )
-        if response.ok:
-            services = response.json()
-            notify_services = []
-            for domain in services:
-                if domain["domain"] == "notify":
-                    notify_services.extend([
-                        f"notify.{service}" for service in domain["services"]
-                    ])
-            return notify_services
-        return []
+        return fetch_ha_notify_services()
     except Exception as e:
         print(f"Error fetching services: {e}")
         return []
 
+def handle_people_changed(people):
+    """Add new Home Assistant people to the configuration as they appear."""
+    print(f"Home Assistant people changed: {', '.join(people)}")
+    people_cache.invalidate()
+    sync_config_with_people(people)
+
+def handle_services_changed(services):
+    """Show new and removed notify services without waiting for the cache to expire."""
+    print(f"Home Assistant notify services changed: {len(services)} available")
+    services_cache.invalidate()
+
+ha_websocket = HomeAssistantWebSocket(
+    SUPERVISOR_WEBSOCKET,
+    SUPERVISOR_TOKEN,
+    on_people_changed=handle_people_changed,
+    on_services_changed=handle_services_changed,
+    request_timeout=SUPERVISOR_READ_TIMEOUT
+)
+
+people_cache = DiscoveryCache("people", fetch_ha_people, ttl=DISCOVERY_TTL)
+services_cache = DiscoveryCache("notify services", fetch_ha_notify_services, ttl=DISCOVERY_TTL)
+
 def call_ha_service(service_domain, service, data):
-    """Call a Home Assistant service."""
+    """Call a Home Assistant service, raising DeliveryError with the cause if it fails."""
     try:
-        response = requests.post(
-            f"http://supervisor/core/api/services/{service_domain}/{service}",
-            headers={"Authorization": f"Bearer {SUPERVISOR_TOKEN}"},
-            json=data
-        )
-        return response.ok
+        response = supervisor.post(f"/services/{service_domain}/{service}", data)
+    except ReadTimeout as e:
+        # The call was sent, Home Assistant may still carry it out
+        raise DeliveryError(f"No answer from Home Assistant: {e}", unconfirmed=True)
     except Exception as e:
-        print(f"Error calling service: {e}")
-        return False
+        raise DeliveryError(f"Error calling service: {e}")
+    if not response.ok:
+        # A gateway timeout from the Supervisor does not mean Core skipped the call
+        raise DeliveryError(
+            f"HTTP {response.status_code}: {response.text[:200]}",
+            unconfirmed=response.status_code == 504
+        )
+    return True
 
-def load_config():
-    """Load configuration from file."""
+def call_ha_service_websocket(delivery):
+    """Call a notify service over the WebSocket connection."""
+    outcome = "error"
     try:
-        with open(CONFIG_FILE, "r") as f:
-            return yaml.safe_load(f)
+        ha_websocket.call_service(delivery["domain"], delivery["service"], delivery["data"])
+        outcome = "ok"
+    except NotConnectedError:
+        outcome = None
+        raise
+    except (TimeoutError, ConnectionError) as e:
+        # Sent, but the answer never came back
+        raise DeliveryError(f"No answer over WebSocket: {e}", unconfirmed=True)
     except Exception as e:
-        print(f"Error loading config: {e}")
-        # Return a default config if file can't be loaded
-        return {
-            "audiences": {},
-            "severity_levels": ["info", "warning", "critical"]
-        }
+        raise DeliveryError(f"Error calling service over WebSocket: {e}")
+    finally:
+        if outcome is not None:
+            SUPERVISOR_REQUESTS.labels("WEBSOCKET", "services", outcome).inc()
+    return True
+
+def send_delivery(delivery):
+    """Send one routed delivery to its Home Assistant notify service."""
+    call = span("call_ha_service", person=delivery["person"], device=delivery["device"])
+    with SERVICE_CALL_SECONDS.time(), call as attributes:
+        attributes["success"] = False
+        try:
+            if ha_websocket.connected:
+                try:
+                    attributes["transport"] = "websocket"
+                    attributes["success"] = call_ha_service_websocket(delivery)
+                    return True
+                except NotConnectedError:
+                    # The socket dropped before the call was sent, use the REST API
+                    pass
+            attributes["transport"] = "rest"
+            attributes["success"] = call_ha_service(delivery["domain"], delivery["service"], delivery["data"])
+            return True
+        except DeliveryError as e:
+            attributes["error"] = str(e)
+            raise
+
+device_health = DeviceHealth(failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN)
+
+dispatcher = DeliveryDispatcher(
+    send_delivery,
+    max_workers=MAX_CONCURRENT_DELIVERIES,
+    per_request_limit=MAX_DELIVERIES_PER_REQUEST,
+    severity_limits=SEVERITY_CONCURRENCY,
+    health=device_health
+)
+
+def dispatch_deliveries(deliveries):
+    """Dispatch deliveries and count their outcomes."""
+    results = dispatcher.dispatch(deliveries)
+    for delivery, result in zip(deliveries, results):
+        DELIVERIES.labels(delivery["person"], delivery["severity"], result["status"]).inc()
+    return results
+
+outbox = Outbox(OUTBOX_FILE, dispatch_deliveries, max_attempts=OUTBOX_MAX_ATTEMPTS) if OUTBOX_ENABLED else None
+
+def deliver(deliveries):
+    """Dispatch deliveries and hand the failed ones to the outbox for retrying."""
+    with span("deliver", deliveries=len(deliveries)):
+        results = dispatch_deliveries(deliveries)
+    if outbox is not None:
+        unsent = [
+            (delivery, result) for delivery, result in zip(deliveries, results)
+            if result["status"] != "sent"
+        ]
+        for (delivery, result), entry_id in zip(unsent, outbox.add(unsent)):
+            # Possibly delivered, so kept as a dead letter to be retried by hand
+            result["outbox_id" if result["status"] == "unconfirmed" else "retry_id"] = entry_id
+    return results
+
+def migrate_config_to_json():
+    """Create the JSON config from the YAML one the first time JSON is used."""
+    if os.path.exists(CONFIG_JSON_FILE) or not os.path.exists(CONFIG_FILE):
+        return
+    print(f"Converting {CONFIG_FILE} to {CONFIG_JSON_FILE}")
+    ConfigStore(CONFIG_JSON_FILE, {}).save(ConfigStore(CONFIG_FILE, {}).get())
+
+if CONFIG_FORMAT == "json":
+    migrate_config_to_json()
+    CONFIG_FILE = CONFIG_JSON_FILE
+
+config_store = ConfigStore(CONFIG_FILE, {
+    "audiences": {},
+    "severity_levels": ["info", "warning", "critical"]
+})
+
+routing_cache = RoutingCache()
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage for /metrics and as a span of the current trace."""
+    with STAGE_SECONDS.labels(name).time(), span(name):
+        yield
+
+def load_config():
+    """Load configuration, reparsing the file only when it has changed."""
+    with stage("config_load"):
+        return config_store.get()
+
+def get_routing_table(config):
+    """Return the compiled routing table for a configuration snapshot."""
+    routing_table = routing_cache.get(config)
+    dispatcher.set_severity_levels(routing_table.severity_levels)
+    return routing_table
 
 def save_config(config):
     """Save configuration to file."""
     try:
-        with open(CONFIG_FILE, "w") as f:
-            yaml.dump(config, f, default_flow_style=False)
+        config_store.save(config)
         return True
     except Exception as e:
         print(f"Error saving config: {e}")
         return False
 
-def get_hash(payload):
-    """Generate a hash for deduplication."""
-    base = json.dumps(payload, sort_keys=True)
-    return hashlib.sha256(base.encode()).hexdigest()
+def get_hash(payload, person=None):
+    """Generate a key for deduplication."""
+    return make_dedup_key(
+        payload,
+        person=person,
+        fields=DEDUPLICATION_FIELDS,
+        ignore_message=DEDUPLICATION_IGNORE_MESSAGE
+    )
 
 def sync_config_with_people(people):
     """Ensure all Home Assistant people are in our config."""
-    config = load_config()
-    
-    # Make sure audiences exists
-    if "audiences" not in config:
-        config["audiences"] = {}
-    
-    # Add any missing people
-    for person in people:
-        if person not in config["audiences"]:
+    # Nothing to write if every person is already configured
+    audiences = load_config().get("audiences") or {}
+    if all(person in audiences for person in people):
+        return True
+
+    def add_missing_people(config):
+        # Make sure audiences exists
+        if not config.get("audiences"):
+            config["audiences"] = {}
+        
+        # Add any missing people; returning False skips the write
+        missing = [person for person in people if person not in config["audiences"]]
+        for person in missing:
             config["audiences"][person] = {
                 "critical_notification": "all_devices",
                 "warning_notification": "mobile_only",
@@ -799,15 +381,442 @@ def sync_config_with_people(people):
                     "desktop": []
                 }
             }
-    
-    # Save updated config
-    return save_config(config)
+        return bool(missing)
+
+    try:
+        config_store.update(add_missing_people)
+        return True
+    except Exception as e:
+        print(f"Error saving config: {e}")
+        return False
+
+def validate_person_changes(changes):
+    """Return an error message if a per-person config update is invalid."""
+    if not isinstance(changes, dict) or not changes:
+        return "Expected an object with the fields to change"
+    for field, value in changes.items():
+        if field == "devices":
+            if not isinstance(value, dict) or not all(
+                isinstance(devices, list) and all(isinstance(device, str) for device in devices)
+                for devices in value.values()
+            ):
+                return "devices must map device groups to lists of notify services"
+        elif field.endswith("_notification"):
+            if not isinstance(value, str):
+                return f"{field} must be a string"
+        elif field.endswith("_digest"):
+            if value is not None and not isinstance(value, (bool, dict)):
+                return f"{field} must be an object, true or null"
+        else:
+            return f"Unknown field: {field}"
+    return None
+
+def update_person_config(person, changes):
+    """Apply a partial update to one person's configuration.
+
+    Device groups are replaced individually, a null value removes a field,
+    and every other field is replaced. Returns False, without writing the
+    file, if the person is not configured.
+    """
+    def apply_changes(config):
+        person_config = (config.get("audiences") or {}).get(person)
+        if person_config is None:
+            return False
+        for field, value in changes.items():
+            if field == "devices":
+                devices = person_config.setdefault("devices", {})
+                devices.update(value)
+            elif value is None:
+                person_config.pop(field, None)
+            else:
+                person_config[field] = value
+        return True
+
+    return config_store.update(apply_changes)
+
+def validate_notification(payload):
+    """Return an error message if a notification payload is invalid."""
+    if not isinstance(payload, dict):
+        return "Expected a JSON object"
+
+    # Validate required fields
+    required_fields = ["title", "message", "severity", "audience"]
+    missing_fields = [field for field in required_fields if field not in payload]
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+    return None
+
+def build_device_data(severity, title, message):
+    """Build the notify service data for a notification."""
+    return {
+        "title": f"[{severity.upper()}] {title}",
+        "message": message,
+        "data": {
+            "priority": "high" if severity == "critical" else "normal",
+            "channel": severity,
+            "ttl": 0 if severity == "critical" else 3600
+        }
+    }
+
+def route_notification(payload, routing_table):
+    """Deduplicate a notification and resolve the device calls it needs."""
+    title = payload.get("title")
+    message = payload.get("message")
+    severity = payload.get("severity")
+    audience = payload.get("audience", [])
+
+    # Deduplicate per person so overlapping audiences are only notified once
+    recipients = []
+    duplicates = []
+    with stage("dedup"):
+        for target in audience:
+            if sent_messages.check_and_add(get_hash(payload, target)):
+                recipients.append(target)
+            else:
+                duplicates.append(target)
+
+    with stage("routing"):
+        device_data = build_device_data(severity, title, message)
+
+        deliveries = []
+        digested = []
+        preferences = {}
+        for target in recipients:
+            route = routing_table.lookup(target, severity)
+            preferences[target] = route.preference
+        
+            print(f"Notifying {target} with {severity} priority (preference: {route.preference})")
+        
+            # Always log the notification
+            print(f"[LOG] Notification for {target}: [{severity.upper()}] {title} - {message}")
+        
+            # Skip further processing if preference is "None" or "Log Only"
+            if route.preference in SILENT_PREFERENCES:
+                continue
+
+            # Buffer the notification if this person gets a digest for this severity
+            if route.digest and route.targets:
+                digest_buffer.add(
+                    target, severity, route.targets, title, message,
+                    route.digest.max_delay, route.digest.max_batch
+                )
+                digested.append(target)
+                continue
+        
+            # Collect the Home Assistant service calls for this person
+            for domain, service in route.targets:
+                deliveries.append({
+                    "person": target,
+                    "severity": severity,
+                    "device": f"{domain}.{service}",
+                    "domain": domain,
+                    "service": service,
+                    "data": device_data
+                })
+
+    return {
+        "status": "ok",
+        "recipients": recipients,
+        "duplicates": duplicates,
+        "digested": digested,
+        "preferences": preferences,
+        "deliveries": deliveries
+    }
+
+def log_delivery_results(results):
+    """Log delivery results and return the number of successful sends."""
+    notification_count = 0
+    for result in results:
+        if result["status"] == "sent":
+            print(f"[{result['person'].upper()}] Successfully sent to {result['device']}")
+            notification_count += 1
+        else:
+            if "retry_id" in result:
+                retry = " (queued for retry)"
+            elif "outbox_id" in result:
+                retry = " (may have been delivered, not retried)"
+            else:
+                retry = ""
+            reason = "Skipped unreachable device" if result["status"] == "skipped" else "Failed to send to"
+            error = f": {result['error']}" if "error" in result else ""
+            print(f"[{result['person'].upper()}] {reason} {result['device']}{error}{retry}")
+    return notification_count
+
+def record_history(payload, routed, results, started):
+    """Queue an audit log entry for every person a notification was routed to."""
+    if history is None:
+        return
+    latency_ms = round((time.monotonic() - started) * 1000, 1)
+    results_by_person = {}
+    for result in results:
+        results_by_person.setdefault(result["person"], []).append(result)
+
+    entry = {
+        "severity": payload.get("severity"),
+        "title": payload.get("title"),
+        "message": payload.get("message"),
+        "latency_ms": latency_ms,
+        "payload": payload
+    }
+    for person in routed["duplicates"]:
+        history.record(person, status="duplicate", **entry)
+    for person in routed["recipients"]:
+        person_results = results_by_person.get(person, [])
+        delivered = sum(1 for result in person_results if result["status"] == "sent")
+        if person in routed["digested"]:
+            status = "digested"
+        elif not person_results:
+            status = "logged"
+        else:
+            status = "sent" if delivered else "failed"
+        history.record(
+            person,
+            status=status,
+            preference=routed["preferences"].get(person),
+            delivered=delivered,
+            results=person_results,
+            **entry
+        )
+
+def complete_queued_notification(results, context):
+    """Log and record a queued notification once it has been delivered."""
+    log_delivery_results(results)
+    payload, routed, started = context
+    record_history(payload, routed, results, started)
+    trace = current_trace()
+    if trace is not None:
+        tracer.finish(trace)
+
+history = NotificationHistory(HISTORY_FILE, retention_days=HISTORY_RETENTION_DAYS) if HISTORY_ENABLED else None
+
+def send_digests(batches):
+    """Send buffered notifications as one digest per person and device."""
+    deliveries = []
+    for batch in batches:
+        severity = batch["severity"]
+        items = batch["items"]
+        if len(items) == 1:
+            title, message = items[0]
+        else:
+            title = f"{len(items)} notifications"
+            message = "\n".join(f"{item_title} - {item_message}" for item_title, item_message in items)
+        print(f"Sending {severity} digest of {len(items)} notifications to {batch['person']}")
+        device_data = build_device_data(severity, title, message)
+        for domain, service in batch["targets"]:
+            deliveries.append({
+                "person": batch["person"],
+                "severity": severity,
+                "device": f"{domain}.{service}",
+                "domain": domain,
+                "service": service,
+                "data": device_data
+            })
+    log_delivery_results(deliver(deliveries))
+
+digest_buffer = DigestBuffer(send_digests)
+atexit.register(digest_buffer.flush_all)
+
+delivery_queue = DeliveryQueue(
+    deliver,
+    workers=QUEUE_WORKERS,
+    on_complete=complete_queued_notification
+)
+
+def discovery_response(key, cache):
+    """Return a cached discovery result, honouring If-None-Match."""
+    value, etag = cache.get()
+    response = jsonify({key: value or []})
+    response.headers["Cache-Control"] = "no-cache"
+    if etag:
+        response.set_etag(etag)
+    return response.make_conditional(request)
+
+def process_notification(payload):
+    """Validate, deduplicate, route and deliver one notification.
+
+    Returns the response body and HTTP status code.
+    """
+    started = time.monotonic()
+    with stage("parse"):
+        error = validate_notification(payload)
+    if error:
+        REQUESTS.labels("error").inc()
+        return {"status": "error", "message": error}, 400
+
+    queued = bool(payload.pop("queued", QUEUED_DELIVERY))
+    config = load_config()
+    routed = route_notification(payload, get_routing_table(config))
+
+    if routed["duplicates"] and not routed["recipients"]:
+        record_history(payload, routed, [], started)
+        REQUESTS.labels("duplicate").inc()
+        return {
+            "status": "duplicate", 
+            "message": "Message already sent recently"
+        }, 200
+
+    # Hand the deliveries to the background workers and return immediately
+    if queued:
+        # The trace is finished once the queued deliveries are done
+        trace = current_trace()
+        if trace is not None:
+            trace.deferred = True
+        notification_id = delivery_queue.submit(
+            routed["deliveries"],
+            routed["duplicates"],
+            priority=dispatcher.priority(payload["severity"]),
+            context=(payload, routed, started)
+        )
+        REQUESTS.labels("queued").inc()
+        return {
+            "status": "queued",
+            "message": "Notification queued for delivery",
+            "id": notification_id,
+            "pending": len(routed["deliveries"]),
+            "duplicates": routed["duplicates"],
+            "digested": routed["digested"]
+        }, 202
+
+    # Send to all devices in parallel
+    results = deliver(routed["deliveries"])
+    record_history(payload, routed, results, started)
+    REQUESTS.labels("ok").inc()
+
+    return {
+        "status": "ok", 
+        "message": "Notification routed", 
+        "delivered": log_delivery_results(results),
+        "duplicates": routed["duplicates"],
+        "digested": routed["digested"],
+        "results": results
+    }, 200
+
+def process_batch(notifications):
+    """Route and deliver a list of notifications together.
+
+    Returns the response body and HTTP status code.
+    """
+    started = time.monotonic()
+    # Route every notification against the same configuration snapshot
+    routing_table = get_routing_table(load_config())
+    items = []
+    for notification in notifications:
+        with stage("parse"):
+            error = validate_notification(notification)
+        if error:
+            items.append({"status": "error", "message": error})
+            continue
+        items.append(route_notification(notification, routing_table))
+
+    # Send each distinct device call once, however many notifications share it
+    unique_deliveries = []
+    delivery_index = {}
+    for item in items:
+        item["send_indexes"] = []
+        for delivery in item.get("deliveries", []):
+            key = (delivery["device"], json.dumps(delivery["data"], sort_keys=True))
+            if key not in delivery_index:
+                delivery_index[key] = len(unique_deliveries)
+                unique_deliveries.append(delivery)
+            item["send_indexes"].append(delivery_index[key])
+
+    unique_results = deliver(unique_deliveries)
+    log_delivery_results(unique_results)
+
+    responses = []
+    delivered = 0
+    for index, item in enumerate(items):
+        if item["status"] == "error":
+            responses.append({"index": index, "status": "error", "message": item["message"]})
+            continue
+        if item["duplicates"] and not item["recipients"]:
+            record_history(notifications[index], item, [], started)
+            responses.append({
+                "index": index,
+                "status": "duplicate",
+                "message": "Message already sent recently"
+            })
+            continue
+
+        results = []
+        for delivery, send_index in zip(item["deliveries"], item["send_indexes"]):
+            results.append(dict(
+                unique_results[send_index],
+                person=delivery["person"],
+                device=delivery["device"]
+            ))
+        record_history(notifications[index], item, results, started)
+        item_delivered = sum(1 for result in results if result["status"] == "sent")
+        delivered += item_delivered
+        responses.append({
+            "index": index,
+            "status": "ok",
+            "message": "Notification routed",
+            "delivered": item_delivered,
+            "duplicates": item["duplicates"],
+            "digested": item["digested"],
+            "results": results
+        })
+
+    for response in responses:
+        REQUESTS.labels(response["status"]).inc()
+    return {
+        "status": "ok",
+        "message": f"Routed {len(notifications)} notifications",
+        "delivered": delivered,
+        "service_calls": len(unique_deliveries),
+        "items": responses
+    }, 200
+
+def traced(name, process, payload):
+    """Run process(payload) in a new trace and add the trace ID to its body."""
+    with tracer.start(name) as trace:
+        body, status_code = process(payload)
+    body["trace_id"] = trace.trace_id
+    return body, status_code, trace
+
+def traced_response(body, status_code, trace):
+    """Build a JSON response carrying the trace ID and stage timings."""
+    response = jsonify(body)
+    response.headers["X-Trace-Id"] = trace.trace_id
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response, status_code
+
+tracer = Tracer(max_traces=TRACE_BUFFER_SIZE, export_path=TRACE_EXPORT_FILE)
+
+def handle_mqtt_notification(payload):
+    """Handle a notification, or a list of them, received over MQTT."""
+    if isinstance(payload, list):
+        body, _, _ = traced("notify_batch", process_batch, payload)
+    else:
+        body, _, _ = traced("notify", process_notification, payload)
+    return body
+
+mqtt_ingest = MqttIngest(
+    handle_mqtt_notification,
+    MQTT_HOST,
+    port=MQTT_PORT,
+    topic=MQTT_TOPIC,
+    result_topic=MQTT_RESULT_TOPIC,
+    username=MQTT_USERNAME,
+    password=MQTT_PASSWORD,
+    qos=MQTT_QOS
+)
 
 @app.route(f"{INGRESS_PATH}/", methods=["GET"])
 @app.route("/", methods=["GET"])
 def index():
     """Serve the main web UI."""
-    return render_template_string(MAIN_TEMPLATE)
+    return ui_page.response(request, Response)
+
+@app.route(f"{INGRESS_PATH}/static/<name>", methods=["GET"])
+@app.route("/static/<name>", methods=["GET"])
+def ui_asset(name):
+    """Serve a content-hashed UI asset."""
+    asset = ui_assets.get(name)
+    if asset is None:
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    return asset.response(request, Response)
 
 @app.route(f"{INGRESS_PATH}/current_user", methods=["GET"])
 @app.route("/current_user", methods=["GET"])
@@ -837,13 +846,13 @@ def set_user():
 @app.route("/ha_people", methods=["GET"])
 def ha_people():
     """Return Home Assistant people."""
-    return jsonify({"people": get_ha_people()})
+    return discovery_response("people", people_cache)
 
 @app.route(f"{INGRESS_PATH}/ha_services", methods=["GET"])
 @app.route("/ha_services", methods=["GET"])
 def ha_services():
     """Return Home Assistant notification services."""
-    return jsonify({"services": get_ha_notify_services()})
+    return discovery_response("services", services_cache)
 
 @app.route(f"{INGRESS_PATH}/sync_people", methods=["POST"])
 @app.route("/sync_people", methods=["POST"])
@@ -857,6 +866,7 @@ def sync_people():
     if "people" not in payload:
         return jsonify({"status": "error", "message": "Missing 'people' field"}), 400
     
+    people_cache.invalidate()
     if sync_config_with_people(payload["people"]):
         return jsonify({"status": "ok", "message": "Configuration synchronized with people"})
     else:
@@ -872,6 +882,22 @@ def get_config():
         mimetype='application/json'
     )
 
+@app.route(f"{INGRESS_PATH}/config/stats", methods=["GET"])
+@app.route("/config/stats", methods=["GET"])
+def config_stats():
+    """Return configuration cache and routing table statistics."""
+    routing_table = get_routing_table(load_config())
+    stats = config_store.stats()
+    stats["routing"] = {
+        "builds": routing_cache.builds,
+        "routes": len(routing_table.routes),
+        "invalid_devices": [
+            {"person": person, "device": device}
+            for person, device in routing_table.invalid_devices
+        ]
+    }
+    return jsonify(stats)
+
 @app.route(f"{INGRESS_PATH}/config", methods=["POST"])
 @app.route("/config", methods=["POST"])
 def update_config():
@@ -890,95 +916,360 @@ def update_config():
     else:
         return jsonify({"status": "error", "message": "Failed to save configuration"}), 500
 
+@app.route(f"{INGRESS_PATH}/config/audiences/<person>", methods=["PATCH"])
+@app.route("/config/audiences/<person>", methods=["PATCH"])
+def patch_person_config(person):
+    """Update some of one person's configuration fields."""
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Expected JSON payload"}), 400
+    return apply_person_changes(person, request.get_json())
+
+@app.route(f"{INGRESS_PATH}/config/audiences/<person>/<field>", methods=["PUT"])
+@app.route("/config/audiences/<person>/<field>", methods=["PUT"])
+def put_person_field(person, field):
+    """Set a single configuration field for one person."""
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Expected JSON payload"}), 400
+    payload = request.get_json()
+    if not isinstance(payload, dict) or "value" not in payload:
+        return jsonify({"status": "error", "message": "Missing 'value' field"}), 400
+    return apply_person_changes(person, {field: payload["value"]})
+
+def apply_person_changes(person, changes):
+    """Validate and save a per-person update, returning the response."""
+    error = validate_person_changes(changes)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+    try:
+        updated = update_person_config(person, changes)
+    except ConfigLoadError as e:
+        print(f"Not saving config: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    except Exception as e:
+        print(f"Error saving config: {e}")
+        return jsonify({"status": "error", "message": "Failed to save configuration"}), 500
+    if not updated:
+        return jsonify({"status": "error", "message": f"Unknown person: {person}"}), 404
+    return jsonify({
+        "status": "ok",
+        "message": "Configuration saved",
+        "person": load_config()["audiences"][person]
+    })
+
+@app.route(f"{INGRESS_PATH}/config/export", methods=["GET"])
+@app.route("/config/export", methods=["GET"])
+def export_config():
+    """Download the current configuration as YAML."""
+    return Response(
+        config_store.export_yaml(),
+        mimetype="application/x-yaml",
+        headers={"Content-Disposition": "attachment; filename=notification_config.yaml"}
+    )
+
+@app.route(f"{INGRESS_PATH}/dedup/stats", methods=["GET"])
+@app.route("/dedup/stats", methods=["GET"])
+def dedup_stats():
+    """Return deduplication store statistics."""
+    return jsonify(sent_messages.stats())
+
 @app.route(f"{INGRESS_PATH}/notify", methods=["POST"])
 @app.route("/notify", methods=["POST"])
 def notify():
     """Handle notification requests."""
     if not request.is_json:
+        REQUESTS.labels("error").inc()
         return jsonify({"status": "error", "message": "Expected JSON payload"}), 400
         
     payload = request.get_json()
     
-    # Validate required fields
-    required_fields = ["title", "message", "severity", "audience"]
-    missing_fields = [field for field in required_fields if field not in payload]
-    if missing_fields:
-        return jsonify({
-            "status": "error", 
-            "message": f"Missing required fields: {', '.join(missing_fields)}"
-        }), 400
-    
-    config = load_config()
-    message_id = get_hash(payload)
+    return traced_response(*traced("notify", process_notification, payload))
 
-    now = time.time()
-    last_sent = SENT_MESSAGES.get(message_id, 0)
-    if now - last_sent < DEDUPLICATION_TTL:
-        return jsonify({
-            "status": "duplicate", 
-            "message": "Message already sent recently"
-        }), 200
+@app.route(f"{INGRESS_PATH}/metrics", methods=["GET"])
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Return request, latency and delivery metrics in the Prometheus text format."""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
-    title = payload.get("title")
-    message = payload.get("message")
-    severity = payload.get("severity")
-    audience = payload.get("audience", [])
+@app.route(f"{INGRESS_PATH}/dispatcher/stats", methods=["GET"])
+@app.route("/dispatcher/stats", methods=["GET"])
+def dispatcher_stats():
+    """Return waiting and in-flight deliveries per severity."""
+    return jsonify({
+        "max_workers": dispatcher.max_workers,
+        "queued_notifications": delivery_queue.size(),
+        "severities": dispatcher.stats()
+    })
 
-    SENT_MESSAGES[message_id] = now
-    
-    notification_count = 0
-    for target in audience:
-        target_config = config.get("audiences", {}).get(target, {})
-        pref_key = f"{severity}_notification"
-        preference = target_config.get(pref_key, "none")
-        
-        print(f"Notifying {target} with {severity} priority (preference: {preference})")
-        
-        # Always log the notification
-        print(f"[LOG] Notification for {target}: [{severity.upper()}] {title} - {message}")
-        
-        # Skip further processing if preference is "None" or "Log Only"
-        if preference in ["none", "log_only"]:
-            continue
-        
-        # Get devices based on preference
-        devices = []
-        if preference == "all_devices":
-            devices = target_config.get("devices", {}).get("all", [])
-        elif preference == "mobile_only":
-            devices = target_config.get("devices", {}).get("mobile", [])
-        elif preference == "desktop_only":
-            devices = target_config.get("devices", {}).get("desktop", [])
-        
-        # Send to devices using Home Assistant services
-        for device in devices:
-            if not device.startswith("notify."):
-                print(f"Warning: Invalid device ID {device}, must start with 'notify.'")
-                continue
-                
-            service = device.split('.')[1]
-            data = {
-                "title": f"[{severity.upper()}] {title}",
-                "message": message,
-                "data": {
-                    "priority": "high" if severity == "critical" else "normal",
-                    "channel": severity,
-                    "ttl": 0 if severity == "critical" else 3600
-                }
-            }
-            
-            success = call_ha_service("notify", service, data)
-            if success:
-                print(f"[{target.upper()}] Successfully sent to {device}")
-                notification_count += 1
-            else:
-                print(f"[{target.upper()}] Failed to send to {device}")
+@app.route(f"{INGRESS_PATH}/digest/stats", methods=["GET"])
+@app.route("/digest/stats", methods=["GET"])
+def digest_stats():
+    """Return digest buffer statistics."""
+    return jsonify(digest_buffer.stats())
 
+@app.route(f"{INGRESS_PATH}/discovery/stats", methods=["GET"])
+@app.route("/discovery/stats", methods=["GET"])
+def discovery_stats():
+    """Return people and notify service discovery cache statistics."""
     return jsonify({
-        "status": "ok", 
-        "message": "Notification routed", 
-        "delivered": notification_count
-    }), 200
+        "people": people_cache.stats(),
+        "services": services_cache.stats(),
+        "websocket": ha_websocket.stats()
+    })
+
+@app.route(f"{INGRESS_PATH}/mqtt/stats", methods=["GET"])
+@app.route("/mqtt/stats", methods=["GET"])
+def mqtt_stats():
+    """Return MQTT connection state and message counters."""
+    if not MQTT_ENABLED:
+        return jsonify({"enabled": False})
+    return jsonify(dict(mqtt_ingest.stats(), enabled=True))
+
+@app.route(f"{INGRESS_PATH}/devices/health", methods=["GET"])
+@app.route("/devices/health", methods=["GET"])
+def devices_health():
+    """Return success rate, latency and circuit state per notify target."""
+    return jsonify({
+        "failure_threshold": device_health.failure_threshold,
+        "cooldown": device_health.cooldown,
+        "devices": device_health.snapshot()
+    })
+
+@app.route(f"{INGRESS_PATH}/debug/traces", methods=["GET"])
+@app.route("/debug/traces", methods=["GET"])
+def debug_traces():
+    """Return the most recent notification traces, newest first."""
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), tracer.max_traces))
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be a number"}), 400
+    return jsonify({
+        "traces": tracer.recent(limit),
+        "exported": tracer.exported,
+        "export_errors": tracer.export_errors
+    })
+
+@app.route(f"{INGRESS_PATH}/debug/traces/<trace_id>", methods=["GET"])
+@app.route("/debug/traces/<trace_id>", methods=["GET"])
+def debug_trace(trace_id):
+    """Return one recent trace."""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return jsonify({"status": "error", "message": "Unknown or expired trace ID"}), 404
+    return jsonify(trace)
+
+cpu_profiler = CpuProfiler(app)
+memory_profiler = MemoryProfiler()
+
+def admin_required(view):
+    """Only allow requests that present the configured debug_admin_token."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not DEBUG_ADMIN_TOKEN:
+            return jsonify({"status": "error", "message": "Profiling is disabled, set debug_admin_token"}), 404
+        token = request.headers.get("X-Admin-Token", "")
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            token = authorization[len("Bearer "):]
+        if not hmac.compare_digest(token.encode(), DEBUG_ADMIN_TOKEN.encode()):
+            return jsonify({"status": "error", "message": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def profile_download(export):
+    """Send a profiler export as a file download."""
+    if export is None:
+        return jsonify({"status": "error", "message": "No capture available"}), 404
+    data, filename = export
+    return Response(
+        data,
+        mimetype="application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.route(f"{INGRESS_PATH}/debug/profile/cpu", methods=["POST"])
+@app.route("/debug/profile/cpu", methods=["POST"])
+@admin_required
+def start_cpu_profile():
+    """Start a timed CPU capture ({"mode": "sampling"|"cprofile", "duration": s, "interval_ms": ms})."""
+    options = request.get_json(silent=True) or {}
+    mode = options.get("mode", "sampling")
+    if mode not in CpuProfiler.MODES:
+        return jsonify({"status": "error", "message": f"mode must be one of {', '.join(CpuProfiler.MODES)}"}), 400
+    try:
+        duration = min(max(float(options.get("duration", 30)), 1), 600)
+        interval = min(max(float(options.get("interval_ms", 10)), 1), 1000) / 1000
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "duration and interval_ms must be numbers"}), 400
+    if not cpu_profiler.start(mode, duration, interval):
+        return jsonify({"status": "error", "message": "A capture is already running"}), 409
+    return jsonify(dict(cpu_profiler.status(), status="started")), 202
+
+@app.route(f"{INGRESS_PATH}/debug/profile/cpu", methods=["GET"])
+@app.route("/debug/profile/cpu", methods=["GET"])
+@admin_required
+def cpu_profile():
+    """Return the state and hottest stacks or functions of the last CPU capture."""
+    return jsonify(dict(cpu_profiler.status(), summary=cpu_profiler.summary()))
+
+@app.route(f"{INGRESS_PATH}/debug/profile/cpu", methods=["DELETE"])
+@app.route("/debug/profile/cpu", methods=["DELETE"])
+@admin_required
+def stop_cpu_profile():
+    """End the running CPU capture early."""
+    cpu_profiler.stop()
+    return jsonify({"status": "ok", "message": "Capture stopping"})
+
+@app.route(f"{INGRESS_PATH}/debug/profile/cpu/download", methods=["GET"])
+@app.route("/debug/profile/cpu/download", methods=["GET"])
+@admin_required
+def download_cpu_profile():
+    """Download the last capture as collapsed stacks or a pstats file."""
+    if cpu_profiler.running:
+        return jsonify({"status": "error", "message": "Capture still running"}), 409
+    return profile_download(cpu_profiler.export())
+
+@app.route(f"{INGRESS_PATH}/debug/profile/memory", methods=["POST"])
+@app.route("/debug/profile/memory", methods=["POST"])
+@admin_required
+def start_memory_profile():
+    """Start tracing allocations ({"frames": n})."""
+    options = request.get_json(silent=True) or {}
+    try:
+        frames = min(max(int(options.get("frames", 25)), 1), 100)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "frames must be a number"}), 400
+    memory_profiler.start(frames)
+    return jsonify({"status": "ok", "message": "Tracing allocations", "frames": frames})
+
+@app.route(f"{INGRESS_PATH}/debug/profile/memory", methods=["DELETE"])
+@app.route("/debug/profile/memory", methods=["DELETE"])
+@admin_required
+def stop_memory_profile():
+    """Stop tracing allocations."""
+    memory_profiler.stop()
+    return jsonify({"status": "ok", "message": "Stopped tracing allocations"})
+
+@app.route(f"{INGRESS_PATH}/debug/profile/memory/snapshot", methods=["POST"])
+@app.route("/debug/profile/memory/snapshot", methods=["POST"])
+@admin_required
+def memory_snapshot():
+    """Take a snapshot and return the top allocations and growth since the last one."""
+    if not memory_profiler.tracing:
+        return jsonify({"status": "error", "message": "Start tracing allocations first"}), 409
+    key_type = request.args.get("group_by", "lineno")
+    if key_type not in ("lineno", "filename", "traceback"):
+        return jsonify({"status": "error", "message": "group_by must be lineno, filename or traceback"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 25)), 500)
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be a number"}), 400
+    return jsonify(memory_profiler.snapshot(limit=limit, key_type=key_type))
+
+@app.route(f"{INGRESS_PATH}/debug/profile/memory/download", methods=["GET"])
+@app.route("/debug/profile/memory/download", methods=["GET"])
+@admin_required
+def download_memory_snapshot():
+    """Download the latest snapshot for tracemalloc.Snapshot.load()."""
+    return profile_download(memory_profiler.export())
+
+@app.route(f"{INGRESS_PATH}/history", methods=["GET"])
+@app.route("/history", methods=["GET"])
+def notification_history():
+    """Return recorded notifications, newest first, one page at a time."""
+    if history is None:
+        return jsonify({"status": "error", "message": "Notification history is disabled"}), 404
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+        before_id = request.args.get("before", type=int)
+        since = request.args.get("since", type=float)
+        until = request.args.get("until", type=float)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid query parameter"}), 400
+
+    items, next_cursor = history.query(
+        person=request.args.get("person"),
+        severity=request.args.get("severity"),
+        status=request.args.get("status"),
+        since=since,
+        until=until,
+        before_id=before_id,
+        limit=limit
+    )
+    return jsonify({"items": items, "next": next_cursor})
+
+@app.route(f"{INGRESS_PATH}/history/stats", methods=["GET"])
+@app.route("/history/stats", methods=["GET"])
+def history_stats():
+    """Return notification history write counters."""
+    if history is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(history.stats(), enabled=True))
+
+@app.route(f"{INGRESS_PATH}/outbox", methods=["GET"])
+@app.route("/outbox", methods=["GET"])
+def outbox_entries():
+    """List deliveries waiting for a retry or given up on (?status=pending|dead)."""
+    if outbox is None:
+        return jsonify({"status": "error", "message": "Outbox is disabled"}), 404
+    status = request.args.get("status")
+    if status not in (None, "pending", "dead"):
+        return jsonify({"status": "error", "message": "status must be pending or dead"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 100)), 1000)
+    except ValueError:
+        return jsonify({"status": "error", "message": "limit must be a number"}), 400
+    return jsonify({"entries": outbox.entries(status=status, limit=limit)})
+
+@app.route(f"{INGRESS_PATH}/outbox/stats", methods=["GET"])
+@app.route("/outbox/stats", methods=["GET"])
+def outbox_stats():
+    """Return outbox sizes and retry counters."""
+    if outbox is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(outbox.stats(), enabled=True))
+
+@app.route(f"{INGRESS_PATH}/outbox/<int:entry_id>/retry", methods=["POST"])
+@app.route("/outbox/<int:entry_id>/retry", methods=["POST"])
+def retry_outbox_entry(entry_id):
+    """Retry a dead letter now."""
+    if outbox is None or not outbox.requeue(entry_id):
+        return jsonify({"status": "error", "message": "No such dead letter"}), 404
+    return jsonify({"status": "ok", "message": "Delivery queued for retry"})
+
+@app.route(f"{INGRESS_PATH}/outbox/<int:entry_id>", methods=["DELETE"])
+@app.route("/outbox/<int:entry_id>", methods=["DELETE"])
+def delete_outbox_entry(entry_id):
+    """Drop a delivery from the outbox."""
+    if outbox is None or not outbox.delete(entry_id):
+        return jsonify({"status": "error", "message": "No such outbox entry"}), 404
+    return jsonify({"status": "ok", "message": "Outbox entry deleted"})
+
+@app.route(f"{INGRESS_PATH}/notify/<notification_id>", methods=["GET"])
+@app.route("/notify/<notification_id>", methods=["GET"])
+def notification_status(notification_id):
+    """Return the delivery status of a queued notification."""
+    status = delivery_queue.get(notification_id)
+    if status is None:
+        return jsonify({"status": "error", "message": "Unknown notification ID"}), 404
+    return jsonify(status)
+
+@app.route(f"{INGRESS_PATH}/notify/batch", methods=["POST"])
+@app.route("/notify/batch", methods=["POST"])
+def notify_batch():
+    """Handle several notification requests in one call."""
+    if not request.is_json:
+        return jsonify({"status": "error", "message": "Expected JSON payload"}), 400
+
+    payload = request.get_json()
+    notifications = payload.get("notifications") if isinstance(payload, dict) else payload
+    if not isinstance(notifications, list):
+        return jsonify({
+            "status": "error",
+            "message": "Expected a list of notifications"
+        }), 400
+
+    return traced_response(*traced("notify_batch", process_batch, notifications))
 
 @app.errorhandler(404)
 def not_found(e):
@@ -1005,6 +1296,28 @@ if __name__ == "__main__":
         sync_config_with_people(ha_people)
     else:
         print("Warning: No Home Assistant people found. Check your Home Assistant configuration.")
+
+    # Keep people, services and configuration in sync from Home Assistant events
+    if USE_WEBSOCKET:
+        ha_websocket.start()
+
+    # Accept notifications published to MQTT
+    if MQTT_ENABLED:
+        mqtt_ingest.start()
     
-    print(f"Starting Flask server on port 8732 with INGRESS_PATH={INGRESS_PATH}")
-    app.run(host="0.0.0.0", port=8732)
+    # Serve from a single process so that every worker thread shares the
+    # dedup store, config cache, digest buffers and delivery queue
+    if SERVER == "development":
+        print(f"Starting Flask development server on port {PORT} with INGRESS_PATH={INGRESS_PATH}")
+        app.run(host="0.0.0.0", port=PORT, threaded=True)
+    else:
+        from waitress import serve
+        print(f"Starting waitress on port {PORT} with {SERVER_THREADS} threads and INGRESS_PATH={INGRESS_PATH}")
+        serve(
+            app,
+            host="0.0.0.0",
+            port=PORT,
+            threads=SERVER_THREADS,
+            connection_limit=SERVER_CONNECTION_LIMIT,
+            ident="person_notify"
+        )
@@ -0,0 +1,55 @@
+"""Prometheus metrics for the notification pipeline."""
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST
+
+REGISTRY = CollectorRegistry()
+
+# Most stages finish in well under a millisecond, service calls take tens
+# to thousands of milliseconds
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+CALL_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "person_notify_requests",
+    "Notification requests by outcome",
+    ["status"],
+    registry=REGISTRY
+)
+STAGE_SECONDS = Histogram(
+    "person_notify_stage_duration_seconds",
+    "Time spent in each stage of handling a notification",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY
+)
+# Not labelled by device: with thousands of audiences the per-device series
+# made every scrape take hundreds of milliseconds. /devices/health has the
+# per-device latency.
+SERVICE_CALL_SECONDS = Histogram(
+    "person_notify_service_call_duration_seconds",
+    "Duration of notify service calls",
+    buckets=CALL_BUCKETS,
+    registry=REGISTRY
+)
+DELIVERIES = Counter(
+    "person_notify_deliveries",
+    "Device deliveries by person, severity and outcome",
+    ["person", "severity", "status"],
+    registry=REGISTRY
+)
+DEDUP_ENTRIES = Gauge(
+    "person_notify_dedup_entries",
+    "Notifications currently remembered for deduplication",
+    registry=REGISTRY
+)
+SUPERVISOR_REQUESTS = Counter(
+    "person_notify_supervisor_requests",
+    "Home Assistant API requests through the Supervisor by outcome",
+    ["method", "endpoint", "outcome"],
+    registry=REGISTRY
+)
+
+
+def render_metrics():
+    """Return the metrics in the Prometheus text format and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,89 @@
+"""MQTT transport for notification requests and delivery results."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import paho.mqtt.client as mqtt
+
+
+class MqttIngest:
+    """Accept notification payloads on an MQTT topic.
+
+    Messages use the same JSON schema as POST /notify, or a list of such
+    payloads for a batch. Each message is handled by ``handle(payload)`` on
+    a worker thread so the MQTT network loop never waits on deliveries. When
+    ``result_topic`` is set, the response body is published there.
+    """
+
+    def __init__(self, handle, host, port=1883, topic="person_notify/notify",
+                 result_topic="", username="", password="", qos=1, workers=4):
+        self._handle = handle
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.result_topic = result_topic
+        self.qos = qos
+        self.received = 0
+        self.errors = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify-mqtt")
+
+        self._client = mqtt.Client(
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            client_id="person_notify"
+        )
+        if username:
+            self._client.username_pw_set(username, password or None)
+        self._client.reconnect_delay_set(min_delay=1, max_delay=60)
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+
+    def start(self):
+        """Connect to the broker and process messages in the background."""
+        self._client.connect_async(self.host, self.port)
+        self._client.loop_start()
+
+    def stop(self):
+        """Disconnect from the broker."""
+        self._client.loop_stop()
+        self._client.disconnect()
+        self._executor.shutdown(wait=False)
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"MQTT connection to {self.host}:{self.port} failed: {reason_code}")
+            return
+        print(f"Connected to MQTT broker {self.host}:{self.port}, subscribing to {self.topic}")
+        # Subscribing on every connect restores the subscription after a reconnect
+        client.subscribe(self.topic, qos=self.qos)
+
+    def _on_message(self, client, userdata, message):
+        self.received += 1
+        try:
+            payload = json.loads(message.payload)
+        except ValueError as e:
+            self.errors += 1
+            print(f"Ignoring invalid MQTT notification on {message.topic}: {e}")
+            self._publish({"status": "error", "message": "Expected JSON payload"})
+            return
+        self._executor.submit(self._process, payload)
+
+    def _process(self, payload):
+        try:
+            body = self._handle(payload)
+        except Exception as e:
+            self.errors += 1
+            print(f"Error handling MQTT notification: {e}")
+            body = {"status": "error", "message": str(e)}
+        self._publish(body)
+
+    def _publish(self, body):
+        if self.result_topic:
+            self._client.publish(self.result_topic, json.dumps(body), qos=self.qos)
+
+    def stats(self):
+        """Return connection state and message counters."""
+        return {
+            "connected": self._client.is_connected(),
+            "topic": self.topic,
+            "received": self.received,
+            "errors": self.errors
+        }
@@ -0,0 +1,201 @@
+"""Durable outbox that retries failed deliveries with backoff."""
+import json
+import random
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    person TEXT,
+    severity TEXT,
+    device TEXT NOT NULL,
+    delivery TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+DEFAULT_MAX_ATTEMPTS = {"critical": 10, "warning": 5, "info": 3}
+
+
+class Outbox:
+    """Keep failed deliveries on disk and retry them until they succeed.
+
+    add() stores the deliveries of one dispatch that were not sent, with
+    their results, in a single transaction. A worker
+    thread sends due deliveries through ``dispatch`` and schedules the next
+    attempt with exponential backoff and jitter. A delivery that fails
+    ``max_attempts`` times for its severity is kept as a dead letter, and so
+    is one whose call went unanswered: Home Assistant may have delivered it,
+    so it is only sent again when retried by hand. A delivery skipped
+    because its device's circuit is open does not use up an attempt and
+    waits until the result's ``retry_at``, when the circuit lets a probe
+    through. Pending entries are picked up again after a restart.
+    """
+
+    def __init__(self, path, dispatch, max_attempts=None, base_delay=5,
+                 max_delay=600, batch_size=50):
+        self.path = path
+        self._dispatch = dispatch
+        self.max_attempts = dict(DEFAULT_MAX_ATTEMPTS, **(max_attempts or {}))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.retried = 0
+        self.recovered = 0
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # With WAL a commit no longer waits for an fsync, only checkpoints do
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        threading.Thread(target=self._run, name="notify-outbox", daemon=True).start()
+
+    def _attempts_for(self, severity):
+        return self.max_attempts.get(severity, self.max_attempts.get("info", 3))
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _schedule(self, severity, attempts, result, now):
+        """Return the attempts, status and next attempt time after a dispatch result."""
+        if result["status"] == "skipped":
+            # Nothing was sent; wait for the circuit instead of using up an attempt
+            return attempts, "pending", result.get("retry_at") or now + self._backoff(max(1, attempts))
+        attempts += 1
+        if result["status"] == "unconfirmed" or attempts >= self._attempts_for(severity):
+            return attempts, "dead", now
+        return attempts, "pending", now + self._backoff(attempts)
+
+    def add(self, entries):
+        """Store (delivery, result) pairs that were not sent and return their IDs.
+
+        All entries are written in one transaction, so a dispatch with many
+        unreachable devices costs a single commit.
+        """
+        now = time.time()
+        ids = []
+        with self._lock, self._db:
+            for delivery, result in entries:
+                severity = delivery.get("severity")
+                attempts, status, next_attempt_at = self._schedule(severity, 0, result, now)
+                cursor = self._db.execute(
+                    "INSERT INTO outbox (created_at, person, severity, device, delivery, "
+                    "attempts, next_attempt_at, last_error, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        now, delivery.get("person"), severity, delivery["device"], json.dumps(delivery),
+                        attempts, next_attempt_at, result.get("error", result["status"]), status
+                    )
+                )
+                ids.append(cursor.lastrowid)
+        if ids:
+            self._wake.set()
+        return ids
+
+    def _due(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (time.time(), self.batch_size)
+            ).fetchall()
+
+    def _next_due_in(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0, row[0] - time.time())
+
+    def _retry(self, rows):
+        deliveries = [json.loads(row["delivery"]) for row in rows]
+        results = self._dispatch(deliveries)
+        now = time.time()
+        with self._lock, self._db:
+            for row, result in zip(rows, results):
+                if result["status"] != "skipped":
+                    self.retried += 1
+                if result["status"] == "sent":
+                    self.recovered += 1
+                    print(f"[{(row['person'] or '').upper()}] Delivered to {row['device']} on attempt {row['attempts'] + 1}")
+                    self._db.execute("DELETE FROM outbox WHERE id = ?", (row["id"],))
+                    continue
+
+                error = result.get("error", result["status"])
+                attempts, status, next_attempt_at = self._schedule(row["severity"], row["attempts"], result, now)
+                if result["status"] == "unconfirmed":
+                    print(f"[{(row['person'] or '').upper()}] Not retrying {row['device']}, it may have been delivered: {error}")
+                elif status == "dead":
+                    print(f"[{(row['person'] or '').upper()}] Giving up on {row['device']} after {attempts} attempts")
+                self._db.execute(
+                    "UPDATE outbox SET attempts = ?, status = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts, status, next_attempt_at, error, row["id"])
+                )
+
+    def _run(self):
+        while True:
+            try:
+                rows = self._due()
+                if rows:
+                    self._retry(rows)
+                    continue
+                self._wake.wait(self._next_due_in())
+                self._wake.clear()
+            except Exception as e:
+                print(f"Error retrying failed deliveries: {e}")
+                time.sleep(self.base_delay)
+
+    def entries(self, status=None, limit=100):
+        """Return outbox entries, oldest first."""
+        query = "SELECT id, created_at, person, severity, device, attempts, next_attempt_at, last_error, status FROM outbox"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(query, params).fetchall()]
+
+    def requeue(self, entry_id):
+        """Move a dead letter back to pending for an immediate retry."""
+        with self._lock, self._db:
+            updated = self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (time.time(), entry_id)
+            ).rowcount
+        self._wake.set()
+        return bool(updated)
+
+    def delete(self, entry_id):
+        """Remove an entry from the outbox."""
+        with self._lock, self._db:
+            return bool(self._db.execute("DELETE FROM outbox WHERE id = ?", (entry_id,)).rowcount)
+
+    def stats(self):
+        """Return pending and dead letter counts and retry counters."""
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+            ).fetchall())
+        return {
+            "pending": counts.get("pending", 0),
+            "dead": counts.get("dead", 0),
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "max_attempts": self.max_attempts
+        }
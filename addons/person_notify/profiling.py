@@ -0,0 +1,224 @@
+"""On-demand CPU and memory profiling of the running add-on.
+
+Nothing here is active until a capture is started: the sampling thread,
+the cProfile WSGI wrapper and tracemalloc are only installed for the
+duration of a capture, so a disabled profiler costs nothing.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class CpuProfiler:
+    """Run one timed CPU capture at a time.
+
+    ``sampling`` mode records the stack of every thread each ``interval``
+    seconds and produces collapsed stacks for flamegraph.pl or speedscope.
+    ``cprofile`` mode wraps the WSGI app so every request is run under
+    cProfile and produces a pstats file; it only sees request threads.
+    """
+
+    MODES = ("sampling", "cprofile")
+
+    def __init__(self, app):
+        self._app = app
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.mode = None
+        self.running = False
+        self.started_at = None
+        self.ends_at = None
+        self.samples = 0
+        self._stacks = Counter()
+        self._stats = None
+
+    def start(self, mode, duration, interval=0.01):
+        """Start a capture in the background; return False if one is running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self.mode = mode
+            self.started_at = time.time()
+            self.ends_at = self.started_at + duration
+            self.samples = 0
+            self._stacks = Counter()
+            self._stats = None
+            self._stop.clear()
+        target = self._sample if mode == "sampling" else self._profile_requests
+        threading.Thread(
+            target=target, args=(duration, interval), name="notify-profiler", daemon=True
+        ).start()
+        return True
+
+    def stop(self):
+        """End the running capture early."""
+        self._stop.set()
+
+    def _sample(self, duration, interval):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + duration
+        try:
+            while time.monotonic() < deadline and not self._stop.is_set():
+                for thread in threading.enumerate():
+                    names[thread.ident] = thread.name
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+                self._stop.wait(interval)
+        finally:
+            self.running = False
+
+    def _profile_requests(self, duration, interval):
+        stats_lock = threading.Lock()
+        wsgi_app = self._app.wsgi_app
+
+        def profiled_app(environ, start_response):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(wsgi_app, environ, start_response)
+            finally:
+                with stats_lock:
+                    self.samples += 1
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+
+        self._app.wsgi_app = profiled_app
+        try:
+            self._stop.wait(duration)
+        finally:
+            self._app.wsgi_app = wsgi_app
+            self.running = False
+
+    def status(self):
+        """Describe the current or last capture."""
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+            "samples": self.samples
+        }
+
+    def summary(self, limit=25):
+        """Return the hottest stacks or functions of the last capture."""
+        if self.mode == "sampling":
+            return [
+                {"stack": stack.split(";"), "samples": count}
+                for stack, count in self._stacks.most_common(limit)
+            ]
+        if self._stats is None:
+            return []
+        output = io.StringIO()
+        stats = pstats.Stats(stream=output)
+        stats.add(self._stats)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue().splitlines()
+
+    def export(self):
+        """Return the capture as (bytes, file name), or None if there is none."""
+        if self.mode == "sampling" and self._stacks:
+            folded = "".join(f"{stack} {count}\n" for stack, count in self._stacks.items())
+            return folded.encode(), "person_notify.folded"
+        if self.mode == "cprofile" and self._stats is not None:
+            return _dump(self._stats.dump_stats), "person_notify.pstats"
+        return None
+
+
+class MemoryProfiler:
+    """Take tracemalloc snapshots and compare each with the one before."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+        self._latest = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=25):
+        """Start tracing allocations."""
+        with self._lock:
+            self._previous = self._latest = None
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """Stop tracing and drop the snapshots."""
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = self._latest = None
+
+    def snapshot(self, limit=25, key_type="lineno"):
+        """Take a snapshot; return the top allocations and the growth since the last one."""
+        with self._lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            self._previous, self._latest = self._latest, snapshot
+            previous = self._previous
+
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+                for stat in snapshot.statistics(key_type)[:limit]
+            ],
+            "diff": None
+        }
+        if previous is not None:
+            result["diff"] = [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff
+                }
+                for stat in snapshot.compare_to(previous, key_type)[:limit]
+            ]
+        return result
+
+    def export(self):
+        """Return the latest snapshot as (bytes, file name), or None."""
+        with self._lock:
+            snapshot = self._latest
+        if snapshot is None:
+            return None
+        return _dump(snapshot.dump), "person_notify.tracemalloc"
+
+
+def _dump(write):
+    """Run a dump(path) method and return what it wrote."""
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        write(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
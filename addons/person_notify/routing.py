@@ -0,0 +1,120 @@
+"""Precompiled (person, severity) routing index built from the configuration."""
+from collections import namedtuple
+
+# Device bucket used by each notification preference
+PREFERENCE_BUCKETS = {
+    "all_devices": "all",
+    "mobile_only": "mobile",
+    "desktop_only": "desktop"
+}
+
+# Preferences that only log the notification
+SILENT_PREFERENCES = ("none", "log_only")
+
+# Defaults for "<severity>_digest" settings
+DEFAULT_DIGEST_DELAY = 60  # seconds
+DEFAULT_DIGEST_BATCH = 10
+
+Route = namedtuple("Route", ["preference", "targets", "digest"], defaults=(None,))
+
+Digest = namedtuple("Digest", ["max_delay", "max_batch"])
+
+NO_ROUTE = Route("none", ())
+
+
+def parse_device(device):
+    """Split a notify entity ID into its (domain, service) pair, or None."""
+    if not isinstance(device, str) or not device.startswith("notify."):
+        return None
+    domain, _, service = device.partition(".")
+    if not service:
+        return None
+    return (domain, service)
+
+
+def parse_digest(person, severity, settings):
+    """Turn a "<severity>_digest" setting into a Digest, or None when disabled."""
+    if not settings:
+        return None
+    if settings is True:
+        settings = {}
+    try:
+        max_delay = float(settings.get("max_delay", DEFAULT_DIGEST_DELAY))
+        max_batch = int(settings.get("max_batch", DEFAULT_DIGEST_BATCH))
+    except (AttributeError, TypeError, ValueError):
+        print(f"Warning: Invalid {severity}_digest setting for {person}, sending immediately")
+        return None
+    if max_delay <= 0 or max_batch <= 1:
+        return None
+    return Digest(max_delay, max_batch)
+
+
+class RoutingTable:
+    """Map (person, severity) to the preference and notify targets to use."""
+
+    def __init__(self, routes, severity_levels=(), invalid_devices=()):
+        self.routes = routes
+        self.severity_levels = tuple(severity_levels)
+        self.invalid_devices = tuple(invalid_devices)
+
+    def lookup(self, person, severity):
+        """Return the Route for a person and severity."""
+        return self.routes.get((person, severity), NO_ROUTE)
+
+
+def compile_routes(config):
+    """Build a RoutingTable from a loaded configuration."""
+    severities = list(config.get("severity_levels") or [])
+    routes = {}
+    invalid_devices = []
+
+    for person, person_config in (config.get("audiences") or {}).items():
+        person_config = person_config or {}
+        devices = person_config.get("devices") or {}
+
+        buckets = {}
+        for bucket, device_list in devices.items():
+            targets = []
+            for device in device_list or []:
+                target = parse_device(device)
+                if target is None:
+                    print(f"Warning: Invalid device ID {device} for {person}, must start with 'notify.'")
+                    invalid_devices.append((person, device))
+                    continue
+                targets.append(target)
+            buckets[bucket] = tuple(targets)
+
+        person_severities = severities + [
+            key[:-len("_notification")]
+            for key in person_config
+            if key.endswith("_notification") and key[:-len("_notification")] not in severities
+        ]
+        for severity in person_severities:
+            preference = person_config.get(f"{severity}_notification", "none")
+            bucket = PREFERENCE_BUCKETS.get(preference)
+            targets = () if bucket is None else buckets.get(bucket, ())
+            digest = parse_digest(person, severity, person_config.get(f"{severity}_digest"))
+            routes[(person, severity)] = Route(preference, targets, digest)
+
+    return RoutingTable(routes, severities, invalid_devices)
+
+
+class RoutingCache:
+    """Keep the routing table for the most recent configuration snapshot.
+
+    Configuration snapshots are immutable and replaced on every reload, so
+    an identity check is enough to know when the table must be rebuilt.
+    """
+
+    def __init__(self):
+        self._compiled = (None, None)
+        self.builds = 0
+
+    def get(self, config):
+        """Return the routing table for a config snapshot."""
+        compiled_config, table = self._compiled
+        if compiled_config is not config:
+            table = compile_routes(config)
+            self._compiled = (config, table)
+            self.builds += 1
+        return table
@@ -0,0 +1,80 @@
+"""Shared HTTP client for the Home Assistant API behind the Supervisor proxy."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Gateway errors from the Supervisor proxy. Only reads are retried on them: a
+# 504 does not mean Home Assistant Core skipped the request.
+RETRY_STATUSES = (502, 503, 504)
+
+# Only these are repeated after a read timeout or gateway error. A service
+# call is a POST and may already have run, so POSTs are only retried when
+# the connection could not be made and nothing was sent.
+RETRY_METHODS = frozenset(["GET"])
+
+
+class SupervisorClient:
+    """Pooled keep-alive session with timeouts and bounded retries.
+
+    GET requests are retried on connection errors, read errors and gateway
+    errors; POST requests only on connection errors.
+
+    ``on_request(method, path, status)`` is called after every request with
+    the final HTTP status, or None when the request raised.
+    """
+
+    def __init__(self, base_url, token, pool_size=16, connect_timeout=3.05,
+                 read_timeout=10, retries=3, backoff_factor=0.3, on_request=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self._on_request = on_request
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            other=0,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path):
+        """Build the absolute URL for an API path."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except Exception:
+            if self._on_request:
+                self._on_request(method, path, None)
+            raise
+        if self._on_request:
+            self._on_request(method, path, response.status_code)
+        return response
+
+    def get(self, path, **kwargs):
+        """Send a GET request to the API."""
+        return self._request("GET", path, **kwargs)
+
+    def post(self, path, data=None, **kwargs):
+        """Send a POST request with a JSON body to the API."""
+        return self._request("POST", path, json=data, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
@@ -0,0 +1,210 @@
+"""Per-notification traces with timed spans."""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("person_notify_trace", default=None)
+
+
+def _span_id():
+    return os.urandom(8).hex()
+
+
+class Trace:
+    """Timed spans of one notification, sharing a trace ID.
+
+    Spans can be added from any thread; the dispatcher and delivery queue
+    carry the current trace to their workers with contextvars.
+    """
+
+    def __init__(self, name, **attributes):
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = _span_id()
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+        # Set to keep the trace open after the request, e.g. for queued delivery
+        self.deferred = False
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _offset_ms(self, perf):
+        return round((perf - self._started) * 1000, 3)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a span; the yielded attributes can be updated."""
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            ended = time.perf_counter()
+            with self._lock:
+                self.spans.append({
+                    "span_id": _span_id(),
+                    "name": name,
+                    "start_ms": self._offset_ms(started),
+                    "duration_ms": round((ended - started) * 1000, 3),
+                    "thread": threading.current_thread().name,
+                    "attributes": attributes
+                })
+
+    def finish(self):
+        self.duration_ms = self._offset_ms(time.perf_counter())
+
+    def server_timing(self):
+        """Summarize the spans as a Server-Timing header value.
+
+        Stages are summed; for service calls, which run in parallel, the
+        slowest call is reported with its device.
+        """
+        stages = OrderedDict()
+        slowest_call = None
+        with self._lock:
+            for span in self.spans:
+                if span["name"] == "call_ha_service":
+                    if slowest_call is None or span["duration_ms"] > slowest_call["duration_ms"]:
+                        slowest_call = span
+                    continue
+                stages[span["name"]] = stages.get(span["name"], 0) + span["duration_ms"]
+        entries = [f"{name};dur={duration:.3f}" for name, duration in stages.items()]
+        if slowest_call is not None:
+            device = slowest_call["attributes"].get("device", "")
+            entries.append(f'call_ha_service;desc="{device}";dur={slowest_call["duration_ms"]:.3f}')
+        total = self.duration_ms if self.duration_ms is not None else self._offset_ms(time.perf_counter())
+        entries.append(f"total;dur={total:.3f}")
+        return ", ".join(entries)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "spans": spans
+        }
+
+    def to_otlp(self):
+        """Return the trace as an OTLP/JSON ExportTraceServiceRequest."""
+        def attributes(values):
+            return [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in values.items() if value is not None
+            ]
+
+        def nanos(offset_ms):
+            return str(int((self.started_at + offset_ms / 1000) * 1e9))
+
+        trace = self.to_dict()
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2,
+            "startTimeUnixNano": nanos(0),
+            "endTimeUnixNano": nanos(trace["duration_ms"] or 0),
+            "attributes": attributes(self.attributes)
+        }]
+        for span in trace["spans"]:
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": span["span_id"],
+                "parentSpanId": self.span_id,
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": nanos(span["start_ms"]),
+                "endTimeUnixNano": nanos(span["start_ms"] + span["duration_ms"]),
+                "attributes": attributes(dict(span["attributes"], thread=span["thread"]))
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": attributes({"service.name": "person_notify"})},
+                "scopeSpans": [{"scope": {"name": "person_notify"}, "spans": spans}]
+            }]
+        }
+
+
+def current_trace():
+    """Return the trace of the notification being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a span of the current trace, if there is one."""
+    trace = _current.get()
+    if trace is None:
+        yield attributes
+        return
+    with trace.span(name, **attributes) as span_attributes:
+        yield span_attributes
+
+
+class Tracer:
+    """Keep the most recent ``max_traces`` traces and optionally export them.
+
+    With ``export_path`` set, every finished trace is appended to that file
+    as one line of OTLP/JSON, the format of the OpenTelemetry Collector's
+    file exporter, so it can be replayed into any OTLP backend.
+    """
+
+    def __init__(self, max_traces=100, export_path=None):
+        self.max_traces = max(1, int(max_traces))
+        self.export_path = export_path
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.export_errors = 0
+
+    @contextmanager
+    def start(self, name, **attributes):
+        """Make a new trace current for the block and finish it afterwards."""
+        trace = Trace(name, **attributes)
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            if not trace.deferred:
+                self.finish(trace)
+
+    def finish(self, trace):
+        """Record a finished trace in the ring buffer and export it."""
+        trace.finish()
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        if self.export_path:
+            self._export(trace)
+
+    def _export(self, trace):
+        try:
+            line = json.dumps(trace.to_otlp(), default=str)
+            with self._lock, open(self.export_path, "a") as f:
+                f.write(line + "\n")
+            self.exported += 1
+        except Exception as e:
+            self.export_errors += 1
+            print(f"Error exporting trace {trace.trace_id}: {e}")
+
+    def get(self, trace_id):
+        """Return a recent trace by ID, or None."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+        return trace.to_dict() if trace is not None else None
+
+    def recent(self, limit=20):
+        """Return the most recent traces, newest first."""
+        with self._lock:
+            traces = list(self._traces.values())[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
@@ -0,0 +1,430 @@
+// Load configuration data
+let config = {};
+let currentUser = '';
+let availableNotifyServices = [];
+let haPeople = [];
+let deviceHealth = {};
+
+// Initialize the UI
+document.addEventListener('DOMContentLoaded', function() {
+    // Tab switching
+    document.querySelectorAll('.tab').forEach(tab => {
+        tab.addEventListener('click', function() {
+            document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+            document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
+
+            this.classList.add('active');
+            document.getElementById(this.dataset.tab).classList.add('active');
+        });
+    });
+
+    // Fetch Home Assistant people
+    fetchHaPeople();
+
+    // Set up event listeners
+    document.getElementById('confirm-user-btn').addEventListener('click', selectUser);
+    document.getElementById('add-all-device-btn').addEventListener('click', () => addDevice('all'));
+    document.getElementById('add-mobile-device-btn').addEventListener('click', () => addDevice('mobile'));
+    document.getElementById('add-desktop-device-btn').addEventListener('click', () => addDevice('desktop'));
+    document.getElementById('send-test-btn').addEventListener('click', sendTestNotification);
+
+    // Fetch notification services
+    fetchNotifyServices();
+    fetchDeviceHealth();
+});
+
+// Fetch Home Assistant people
+function fetchHaPeople() {
+    fetch(window.location.pathname + 'ha_people')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            haPeople = data.people;
+            fetchCurrentUser();
+        })
+        .catch(error => {
+            showStatusMessage('Error loading Home Assistant people: ' + error.message, 'error');
+            console.error('Error loading people:', error);
+        });
+}
+
+// Fetch current user
+function fetchCurrentUser() {
+    fetch(window.location.pathname + 'current_user')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (data.user && data.user !== 'unknown') {
+                // We have a valid user
+                currentUser = data.user;
+                document.getElementById('user-info').textContent = `Signed in as: ${currentUser}`;
+                document.getElementById('user-select').classList.add('hidden');
+            } else {
+                // We need to ask the user to select a person
+                showUserSelect();
+            }
+
+            // Load config after getting current user
+            fetchConfig();
+        })
+        .catch(error => {
+            showStatusMessage('Error determining current user: ' + error.message, 'error');
+            console.error('Error loading user:', error);
+            showUserSelect();
+        });
+}
+
+// Show user selection UI
+function showUserSelect() {
+    const select = document.getElementById('select-user');
+    select.innerHTML = '';
+
+    haPeople.forEach(person => {
+        const option = document.createElement('option');
+        option.value = person;
+        option.textContent = person;
+        select.appendChild(option);
+    });
+
+    document.getElementById('user-select').classList.remove('hidden');
+}
+
+// Handle user selection
+function selectUser() {
+    const select = document.getElementById('select-user');
+    currentUser = select.value;
+
+    // Set the user via API
+    fetch(window.location.pathname + 'set_user', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ user: currentUser })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'ok') {
+            document.getElementById('user-info').textContent = `Signed in as: ${currentUser}`;
+            document.getElementById('user-select').classList.add('hidden');
+            fetchConfig();
+        } else {
+            showStatusMessage(`Error: ${data.message}`, 'error');
+        }
+    })
+    .catch(error => {
+        showStatusMessage('Error setting user: ' + error.message, 'error');
+    });
+}
+
+// Fetch notification services
+function fetchNotifyServices() {
+    fetch(window.location.pathname + 'ha_services')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            availableNotifyServices = data.services;
+            updateDeviceSelects();
+        })
+        .catch(error => {
+            showStatusMessage('Error loading notification services: ' + error.message, 'error');
+            console.error('Error loading services:', error);
+        });
+}
+
+// Fetch delivery health of notify targets
+function fetchDeviceHealth() {
+    fetch(window.location.pathname + 'devices/health')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            deviceHealth = data.devices;
+            updateDeviceSelects();
+            loadDevicesForUser();
+        })
+        .catch(error => {
+            console.error('Error loading device health:', error);
+        });
+}
+
+// Describe a device's health as a badge label and class
+function getDeviceHealth(device) {
+    const health = deviceHealth[device];
+    if (!health) return null;
+
+    let details = `${Math.round(health.success_rate * 100)}% delivered`;
+    if (health.latency_ms !== null) {
+        details += `, ${health.latency_ms} ms average`;
+    }
+    if (health.state === 'open') {
+        return { label: 'Unreachable', badge: 'badge-critical', details: `${details}, retrying in ${health.retry_in} s` };
+    }
+    if (health.state === 'half_open' || health.success_rate < 0.8) {
+        return { label: 'Degraded', badge: 'badge-warning', details };
+    }
+    return { label: 'Healthy', badge: 'badge-info', details };
+}
+
+// Update device select dropdowns
+function updateDeviceSelects() {
+    const deviceSelects = [
+        document.getElementById('add-all-device'),
+        document.getElementById('add-mobile-device'),
+        document.getElementById('add-desktop-device')
+    ];
+
+    deviceSelects.forEach(select => {
+        select.innerHTML = '';
+
+        availableNotifyServices.forEach(service => {
+            const option = document.createElement('option');
+            option.value = service;
+            const health = getDeviceHealth(service);
+            option.textContent = health && health.label !== 'Healthy' ? `${service} (${health.label.toLowerCase()})` : service;
+            select.appendChild(option);
+        });
+    });
+}
+
+// Fetch configuration
+function fetchConfig() {
+    fetch(window.location.pathname + 'config')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            config = data;
+            updatePreferencesTable();
+            loadDevicesForUser();
+        })
+        .catch(error => {
+            showStatusMessage('Error loading configuration: ' + error.message, 'error');
+            console.error('Error loading configuration:', error);
+        });
+}
+
+// Update the preferences table for current user
+function updatePreferencesTable() {
+    const tbody = document.getElementById('preferences-table');
+    tbody.innerHTML = '';
+
+    if (!currentUser || !config.audiences || !config.audiences[currentUser]) return;
+
+    const preferenceOptions = ['All Devices', 'Mobile Only', 'Desktop Only', 'Log Only', 'None'];
+    const severities = ['critical', 'warning', 'info'];
+
+    severities.forEach(severity => {
+        const row = document.createElement('tr');
+
+        // Severity name
+        const nameCell = document.createElement('td');
+        nameCell.textContent = severity.charAt(0).toUpperCase() + severity.slice(1);
+        row.appendChild(nameCell);
+
+        // Preference select
+        const prefCell = document.createElement('td');
+        const select = document.createElement('select');
+        select.id = `${currentUser}-${severity}`;
+
+        preferenceOptions.forEach(option => {
+            const optEl = document.createElement('option');
+            optEl.value = option.replace(' ', '_').toLowerCase();
+            optEl.textContent = option;
+            select.appendChild(optEl);
+        });
+
+        // Set current value
+        const currentPref = config.audiences[currentUser][severity + '_notification'] || 'none';
+        select.value = currentPref;
+
+        select.addEventListener('change', () => updatePreference(currentUser, severity, select.value));
+
+        prefCell.appendChild(select);
+        row.appendChild(prefCell);
+
+        tbody.appendChild(row);
+    });
+}
+
+// Load devices for current user
+function loadDevicesForUser() {
+    if (!currentUser || !config.audiences || !config.audiences[currentUser]) return;
+
+    const personConfig = config.audiences[currentUser];
+
+    // Update device lists
+    updateDeviceList('all', personConfig.devices?.all || []);
+    updateDeviceList('mobile', personConfig.devices?.mobile || []);
+    updateDeviceList('desktop', personConfig.devices?.desktop || []);
+}
+
+// Update a device list
+function updateDeviceList(type, devices) {
+    const list = document.getElementById(`${type}-devices-list`);
+    list.innerHTML = '';
+
+    devices.forEach(device => {
+        const li = document.createElement('li');
+        li.className = 'device-item';
+
+        const deviceName = document.createElement('span');
+        deviceName.textContent = device;
+
+        const health = getDeviceHealth(device);
+        if (health) {
+            const badge = document.createElement('span');
+            badge.className = `badge ${health.badge}`;
+            badge.textContent = health.label;
+            badge.title = health.details;
+            deviceName.appendChild(document.createTextNode(' '));
+            deviceName.appendChild(badge);
+        }
+
+        const deleteBtn = document.createElement('button');
+        deleteBtn.textContent = 'Remove';
+        deleteBtn.addEventListener('click', () => removeDevice(type, device));
+
+        li.appendChild(deviceName);
+        li.appendChild(deleteBtn);
+        list.appendChild(li);
+    });
+}
+
+// Update notification preference
+function updatePreference(person, severity, value) {
+    config.audiences[person][severity + '_notification'] = value;
+    savePersonChanges(person, { [severity + '_notification']: value });
+}
+
+// Add a device
+function addDevice(type) {
+    const select = document.getElementById(`add-${type}-device`);
+    const device = select.value;
+
+    if (!device) {
+        showStatusMessage(`Please select a notification service`, 'error');
+        return;
+    }
+
+    if (!currentUser || !config.audiences[currentUser]) return;
+
+    // Initialize devices object if it doesn't exist
+    if (!config.audiences[currentUser].devices) {
+        config.audiences[currentUser].devices = { all: [], mobile: [], desktop: [] };
+    }
+
+    // Add to list if not already present
+    if (!config.audiences[currentUser].devices[type].includes(device)) {
+        config.audiences[currentUser].devices[type].push(device);
+        savePersonChanges(currentUser, { devices: { [type]: config.audiences[currentUser].devices[type] } });
+    }
+}
+
+// Remove a device
+function removeDevice(type, device) {
+    if (!currentUser || !config.audiences[currentUser]) return;
+
+    const devices = config.audiences[currentUser].devices[type];
+    const index = devices.indexOf(device);
+
+    if (index !== -1) {
+        devices.splice(index, 1);
+        savePersonChanges(currentUser, { devices: { [type]: devices } });
+    }
+}
+
+// Save changed fields of one person's configuration
+function savePersonChanges(person, changes) {
+    fetch(window.location.pathname + 'config/audiences/' + encodeURIComponent(person), {
+        method: 'PATCH',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(changes)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'ok') {
+            showStatusMessage('Configuration saved successfully', 'success');
+            fetchConfig(); // Reload config
+        } else {
+            showStatusMessage(`Error: ${data.message}`, 'error');
+        }
+    })
+    .catch(error => {
+        showStatusMessage('Error saving configuration: ' + error.message, 'error');
+    });
+}
+
+// Send a test notification
+function sendTestNotification() {
+    const severity = document.getElementById('test-severity').value;
+    const title = document.getElementById('test-title').value;
+    const message = document.getElementById('test-message').value;
+
+    if (!currentUser || !title || !message) {
+        showStatusMessage('Please fill in all fields', 'error');
+        return;
+    }
+
+    fetch(window.location.pathname + 'notify', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            title: title,
+            message: message,
+            severity: severity,
+            audience: [currentUser]
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'ok') {
+            showStatusMessage(`Test notification sent to ${currentUser}`, 'success');
+        } else if (data.status === 'queued') {
+            // Accepted with 202 when queued delivery is on
+            showStatusMessage(`Test notification for ${currentUser} queued (ID ${data.id})`, 'success');
+        } else {
+            showStatusMessage(`Error: ${data.message}`, 'error');
+        }
+    })
+    .catch(error => {
+        showStatusMessage('Error sending notification: ' + error.message, 'error');
+    });
+}
+
+// Show status message
+function showStatusMessage(message, type) {
+    const statusEl = document.getElementById('status-message');
+    statusEl.textContent = message;
+    statusEl.className = `status-message status-${type}`;
+
+    // Show message
+    statusEl.classList.remove('hidden');
+
+    // Hide after 5 seconds
+    setTimeout(() => {
+        statusEl.classList.add('hidden');
+    }, 5000);
+}
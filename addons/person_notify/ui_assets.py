@@ -0,0 +1,79 @@
+"""Web UI assets, built and compressed once at startup."""
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    # Not every architecture has a wheel; gzip is always available
+    brotli = None
+
+# Hashed asset names change whenever their content does, so they can be
+# cached for good; the page itself is revalidated with its ETag.
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+ASSETS = (
+    ("app.css", "text/css"),
+    ("app.js", "application/javascript"),
+)
+
+
+class Asset:
+    """A response body with precomputed encodings and a content hash."""
+
+    def __init__(self, body, mimetype, cache_control=REVALIDATE):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.hash = hashlib.sha256(body).hexdigest()[:16]
+        self.encodings = {"identity": body}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.encodings[encoding] = data
+
+    def encoding_for(self, accept_encodings):
+        """Pick the smallest encoding the client accepts."""
+        accepted = [
+            encoding for encoding in self.encodings
+            if encoding == "identity" or accept_encodings[encoding]
+        ]
+        return min(accepted, key=lambda encoding: len(self.encodings[encoding]))
+
+    def response(self, request, response_class):
+        """Build a conditional response in the best encoding for the request."""
+        encoding = self.encoding_for(request.accept_encodings)
+        response = response_class(self.encodings[encoding], mimetype=self.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = self.cache_control
+        # Each encoding is a different representation and needs its own ETag
+        response.set_etag(self.hash if encoding == "identity" else f"{self.hash}-{encoding}")
+        return response.make_conditional(request)
+
+
+def build_ui(directory, jinja_env):
+    """Load the UI from ``directory`` and return the page and hashed assets.
+
+    index.html is compiled and rendered once with the content-hashed URL of
+    each asset. Returns the page Asset and a dict of hashed name to Asset.
+    """
+    assets = {}
+    urls = {}
+    for name, mimetype in ASSETS:
+        with open(os.path.join(directory, name), "rb") as f:
+            asset = Asset(f.read(), mimetype, cache_control=IMMUTABLE)
+        stem, extension = os.path.splitext(name)
+        hashed_name = f"{stem}.{asset.hash[:12]}{extension}"
+        assets[hashed_name] = asset
+        # Relative, so the URLs also resolve below the ingress path
+        urls[name] = f"static/{hashed_name}"
+
+    with open(os.path.join(directory, "index.html"), "r") as f:
+        template = jinja_env.from_string(f.read())
+    page = Asset(template.render(assets=urls).encode(), "text/html")
+    return page, assets
@@ -0,0 +1,58 @@
+"""Generate a synthetic notification configuration with many audiences.
+
+    python benchmarks/generate_config.py --audiences 1000 > notification_config.yaml
+
+People are named like the ones served by mock_supervisor.py and cycle
+through the preference combinations the add-on supports, so routing sees a
+realistic mix of multi-device, single-device and silent deliveries.
+"""
+import argparse
+import sys
+
+import yaml
+
+from mock_supervisor import person_devices, person_names
+
+PREFERENCE_CYCLE = (
+    ("all_devices", "mobile_only", "log_only"),
+    ("all_devices", "all_devices", "mobile_only"),
+    ("mobile_only", "desktop_only", "none"),
+    ("all_devices", "mobile_only", "mobile_only"),
+)
+
+
+def generate_config(audiences, digest_every=0):
+    """Return a configuration dict with ``audiences`` people.
+
+    Every ``digest_every``-th person gets an info digest when it is set.
+    """
+    config = {"audiences": {}, "severity_levels": ["info", "warning", "critical"]}
+    for index, person in enumerate(person_names(audiences)):
+        phone, laptop = (f"notify.{service}" for service in person_devices(person))
+        critical, warning, info = PREFERENCE_CYCLE[index % len(PREFERENCE_CYCLE)]
+        settings = {
+            "critical_notification": critical,
+            "warning_notification": warning,
+            "info_notification": info,
+            "devices": {
+                "all": [phone, laptop],
+                "mobile": [phone],
+                "desktop": [laptop]
+            }
+        }
+        if digest_every and index % digest_every == 0:
+            settings["info_digest"] = {"max_delay": 60, "max_batch": 10}
+        config["audiences"][person] = settings
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audiences", type=int, default=2)
+    parser.add_argument("--digest-every", type=int, default=0, help="give every Nth person an info digest")
+    args = parser.parse_args()
+    yaml.safe_dump(generate_config(args.audiences, args.digest_every), sys.stdout, sort_keys=False)
+
+
+if __name__ == "__main__":
+    main()
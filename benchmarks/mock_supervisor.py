@@ -0,0 +1,178 @@
+"""Local stand-in for the Home Assistant API behind the Supervisor proxy.
+
+Serves just enough of the REST API for the add-on to run: the people
+template, /states, /services and notify service calls. Service calls can be
+slowed down and made to fail at a configurable rate.
+
+    python benchmarks/mock_supervisor.py --people 100 --latency-ms 50 --failure-rate 0.05
+
+Point the add-on at it with ``"supervisor_url": "http://127.0.0.1:8124/api"``
+in the options file named by the OPTIONS_FILE environment variable.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICE_CALL = re.compile(r"/services/(?P<domain>[^/]+)/(?P<service>[^/]+)$")
+
+
+def person_names(count):
+    """Return ``count`` synthetic person names."""
+    return [f"person_{index:05d}" for index in range(count)]
+
+
+def person_devices(person):
+    """Return the notify services of a synthetic person's phone and laptop."""
+    return [f"mobile_app_{person}_phone", f"{person}_laptop"]
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections at shutdown are expected
+        if not issubclass(sys.exc_info()[0], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockSupervisor:
+    """Threaded HTTP server answering like the Home Assistant REST API."""
+
+    def __init__(self, people, host="127.0.0.1", port=8124, latency_ms=0.0,
+                 jitter_ms=0.0, failure_rate=0.0, seed=None):
+        self.people = list(people)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.requests = 0
+        self.server = QuietServer((host, port), self._handler())
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        """Serve in a background thread."""
+        threading.Thread(target=self.server.serve_forever, name="mock-supervisor", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _call_outcome(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        return delay, failed
+
+    def stats(self):
+        """Return request and service call counters."""
+        with self._lock:
+            return {"requests": self.requests, "calls": self.calls, "failures": self.failures}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def do_GET(self):
+                with mock._lock:
+                    mock.requests += 1
+                if self.path.endswith("/states"):
+                    self._reply(200, [
+                        {"entity_id": f"person.{person}", "state": "home", "attributes": {}}
+                        for person in mock.people
+                    ])
+                elif self.path.endswith("/services"):
+                    services = {}
+                    for person in mock.people:
+                        for service in person_devices(person):
+                            services[service] = {}
+                    self._reply(200, [{"domain": "notify", "services": services}])
+                elif self.path.endswith("/mock/stats"):
+                    self._reply(200, mock.stats())
+                else:
+                    self._reply(404, {"message": "Not found"})
+
+            def do_POST(self):
+                self._read_body()
+                with mock._lock:
+                    mock.requests += 1
+                if self.path.endswith("/template"):
+                    # The add-on renders the list of person entity IDs as JSON
+                    self._reply(200, [f"person.{person}" for person in mock.people])
+                    return
+                if SERVICE_CALL.search(self.path):
+                    delay, failed = mock._call_outcome()
+                    if delay:
+                        time.sleep(delay)
+                    if failed:
+                        self._reply(500, {"message": "Injected failure"})
+                    else:
+                        self._reply(200, [])
+                    return
+                self._reply(404, {"message": "Not found"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8124)
+    parser.add_argument("--people", type=int, default=2, help="number of person entities")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean service call latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="standard deviation of the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of service calls answered with 500")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    mock = MockSupervisor(
+        person_names(args.people),
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+    )
+    print(f"Mock Supervisor with {args.people} people listening on {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
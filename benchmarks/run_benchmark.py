@@ -0,0 +1,262 @@
+"""Benchmark the add-on's HTTP routes against a mock Supervisor.
+
+For every audience size the runner writes a synthetic configuration, starts
+the mock Supervisor and the add-on in a temporary directory, drives each
+scenario at the requested concurrency and reports p50/p95/p99 latency and
+throughput:
+
+    python benchmarks/run_benchmark.py --sizes 2,100,1000,5000 --concurrency 1,16
+
+Use --target to measure an add-on that is already running instead; the
+audience sizes then only control which person names are used.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import yaml
+
+from generate_config import generate_config
+from mock_supervisor import MockSupervisor, person_names
+
+ADDON_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "addons", "person_notify", "main.py")
+SEVERITIES = ("info", "warning", "critical")
+SEVERITY_WEIGHTS = (6, 3, 1)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Scenarios:
+    """Build the request for each scenario from a shared counter."""
+
+    def __init__(self, people, fanout, batch_size, seed=None):
+        self.people = people
+        self.fanout = min(fanout, len(people))
+        self.batch_size = batch_size
+        self._random = random.Random(seed)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _notification(self):
+        with self._lock:
+            number = next(self._counter)
+            audience = self._random.sample(self.people, self.fanout)
+            severity = self._random.choices(SEVERITIES, SEVERITY_WEIGHTS)[0]
+        return {
+            "title": "Benchmark",
+            "message": f"Benchmark notification {number}",
+            "severity": severity,
+            "audience": audience
+        }
+
+    def notify(self):
+        return "POST", "notify", self._notification()
+
+    def notify_duplicate(self):
+        return "POST", "notify", {
+            "title": "Benchmark",
+            "message": "Repeated benchmark notification",
+            "severity": "warning",
+            "audience": self.people[:self.fanout]
+        }
+
+    def notify_queued(self):
+        return "POST", "notify", dict(self._notification(), queued=True)
+
+    def notify_batch(self):
+        return "POST", "notify/batch", [self._notification() for _ in range(self.batch_size)]
+
+    def ui(self):
+        return "GET", "", None
+
+    def config(self):
+        return "GET", "config", None
+
+    def ha_people(self):
+        return "GET", "ha_people", None
+
+    def history(self):
+        return "GET", "history?limit=50", None
+
+    def metrics(self):
+        return "GET", "metrics", None
+
+
+SCENARIOS = [
+    name for name in vars(Scenarios)
+    if not name.startswith("_") and callable(getattr(Scenarios, name))
+]
+
+
+def run_scenario(base_url, build, requests_count, concurrency, warmup):
+    """Send ``requests_count`` requests and return their latency summary."""
+    local = threading.local()
+
+    def send(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = build()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, f"{base_url}/{path}", json=body, timeout=60)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(warmup)))
+        started = time.perf_counter()
+        outcomes = list(executor.map(send, range(requests_count)))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in outcomes)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(outcomes),
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(latencies[-1], 2),
+        "throughput_rps": round(len(outcomes) / wall, 1)
+    }
+
+
+def start_addon(workdir, size, supervisor_url, options):
+    """Start the add-on on a synthetic configuration and wait until it serves."""
+    with open(os.path.join(workdir, "notification_config.yaml"), "w") as f:
+        yaml.safe_dump(generate_config(size), f, sort_keys=False)
+    options_file = os.path.join(workdir, "options.json")
+    with open(options_file, "w") as f:
+        json.dump(dict({"supervisor_url": supervisor_url, "use_websocket": False}, **options), f)
+
+    port = free_port()
+    env = dict(os.environ, OPTIONS_FILE=options_file, PORT=str(port), SUPERVISOR_TOKEN="benchmark")
+    log = open(os.path.join(workdir, "addon.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(ADDON_MAIN)],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Add-on exited during startup, see {log.name}")
+        try:
+            if requests.get(f"{base_url}/config/stats", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Add-on did not start, see {log.name}")
+
+
+def parse_option(value):
+    key, _, raw = value.partition("=")
+    try:
+        return key, json.loads(raw)
+    except ValueError:
+        return key, raw
+
+
+def print_row(row):
+    print(
+        f"{row['audiences']:>9} {row['scenario']:<17} {row['concurrency']:>5} "
+        f"{row['requests']:>8} {row['errors']:>6} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+        f"{row['p99_ms']:>9} {row['throughput_rps']:>9}",
+        flush=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="2,100,1000,5000", help="comma separated audience counts")
+    parser.add_argument("--concurrency", default="1,16", help="comma separated client concurrency levels")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--fanout", type=int, default=3, help="people per notification")
+    parser.add_argument("--batch-size", type=int, default=10, help="notifications per batch request")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mock service call latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--option", action="append", default=[], type=parse_option,
+                        help="add-on option as key=value, e.g. max_concurrent_deliveries=32")
+    parser.add_argument("--target", help="base URL of a running add-on to benchmark instead")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the working directories and logs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print(f"{'audiences':>9} {'scenario':<17} {'conc':>5} {'requests':>8} {'errors':>6} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    results = []
+    for size in sizes:
+        mock = process = workdir = None
+        base_url = args.target.rstrip("/") if args.target else None
+        try:
+            if base_url is None:
+                mock = MockSupervisor(
+                    person_names(size),
+                    port=0,
+                    latency_ms=args.latency_ms,
+                    jitter_ms=args.jitter_ms,
+                    failure_rate=args.failure_rate,
+                    seed=args.seed
+                ).start()
+                workdir = tempfile.mkdtemp(prefix=f"person_notify_bench_{size}_")
+                process, base_url = start_addon(workdir, size, mock.url, dict(args.option))
+
+            builder = Scenarios(person_names(size), args.fanout, args.batch_size, seed=args.seed)
+            for scenario, concurrency in itertools.product(scenarios, levels):
+                summary = run_scenario(
+                    base_url, getattr(builder, scenario), args.requests, concurrency, args.warmup
+                )
+                row = dict(audiences=size, scenario=scenario, concurrency=concurrency, **summary)
+                print_row(row)
+                results.append(row)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+            if mock is not None:
+                mock.stop()
+            if workdir is not None:
+                if args.keep:
+                    print(f"Kept {workdir}")
+                else:
+                    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,27 @@ PREF_NONE = "none"
 
 PREFERENCES = [PREF_ALL_DEVICES, PREF_MOBILE_ONLY, PREF_DESKTOP_ONLY, PREF_LOG_ONLY, PREF_NONE]
 
+# Device bucket used by each notification preference
+PREFERENCE_BUCKETS = {
+    PREF_ALL_DEVICES: "all",
+    PREF_MOBILE_ONLY: "mobile",
+    PREF_DESKTOP_ONLY: "desktop",
+}
+
+# Routing configuration file, looked up in the Home Assistant config
+# directory first and then next to this integration
+CONFIG_FILE = "person_notification_config.yaml"
+
 # Config keys
 CONF_PERSON = "person"
 CONF_SEVERITY = "severity"
 CONF_TITLE = "title"
 CONF_MESSAGE = "message"
 
-# Service name
-SERVICE_NOTIFY_PERSON = "notify_person"
\ No newline at end of file
+# Service names
+SERVICE_NOTIFY_PERSON = "notify_person"
+SERVICE_RELOAD = "reload"
+
+# hass.data keys
+DATA_ROUTES = "routes"
+DATA_PREFERENCES = "preferences"
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""Preferences from input_select helpers for the Person-Based Notification System."""
+import logging
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .router import normalize_preference
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def preference_entity_id(person: str, severity: str) -> str:
+    """Return the input_select holding a person's preference for a severity."""
+    return f"input_select.{person}_{severity}_notification"
+
+
+class PreferenceIndex:
+    """Keep the current value of every preference helper in memory.
+
+    The index is filled from the state machine once and then updated from
+    state_changed events, so a lookup is a single dict access and changes
+    made in the UI apply to the next notification.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._entities: Dict[str, Tuple[str, str]] = {}
+        self._preferences: Dict[Tuple[str, str], str] = {}
+        self._unsubscribe: Optional[Callable[[], None]] = None
+
+    @callback
+    def _set(self, entity_id: str, state) -> None:
+        key = self._entities[entity_id]
+        if state is None or state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            self._preferences.pop(key, None)
+        else:
+            self._preferences[key] = normalize_preference(state.state)
+
+    @callback
+    def _state_changed(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        if entity_id in self._entities:
+            self._set(entity_id, event.data.get("new_state"))
+            _LOGGER.debug("Preference %s changed to %s", entity_id, self._preferences.get(self._entities[entity_id]))
+
+    @callback
+    def async_track(self, keys: Iterable[Tuple[str, str]]) -> None:
+        """Index and follow the helpers for the given (person, severity) pairs."""
+        self.async_stop()
+        self._entities = {preference_entity_id(person, severity): (person, severity) for person, severity in keys}
+        self._preferences = {}
+        for entity_id in self._entities:
+            self._set(entity_id, self.hass.states.get(entity_id))
+        if self._entities:
+            self._unsubscribe = async_track_state_change_event(
+                self.hass, list(self._entities), self._state_changed
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following state changes."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def get(self, person: str, severity: str) -> Optional[str]:
+        """Return the helper's preference, or None if there is no usable helper."""
+        return self._preferences.get((person, severity))
@@ -0,0 +1,110 @@
+"""Notification routing for the Person-Based Notification System integration."""
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    CONFIG_FILE,
+    PREF_NONE,
+    SEVERITIES,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+Target = Tuple[str, str]
+
+
+class Route(NamedTuple):
+    """Configured preference and device buckets for a person and severity."""
+
+    preference: str
+    buckets: Dict[str, Tuple[Target, ...]]
+
+
+def normalize_preference(preference: Any) -> str:
+    """Turn "All Devices" or "all_devices" into the "all_devices" form."""
+    if not preference:
+        return PREF_NONE
+    return str(preference).strip().lower().replace(" ", "_")
+
+
+def parse_device(device: Any) -> Optional[Target]:
+    """Split a notify entity ID into its (domain, service) pair, or None."""
+    if not isinstance(device, str) or not device.startswith("notify."):
+        return None
+    domain, _, service = device.partition(".")
+    return (domain, service) if service else None
+
+
+def compile_routes(config: Dict[str, Any]) -> Dict[Tuple[str, str], Route]:
+    """Map (person, severity) to the configured preference and device buckets.
+
+    Accepts both the add-on layout ("audiences", "severity_levels") and the
+    layout of the file shipped with this integration ("persons", "severities").
+    """
+    people = config.get("audiences") or config.get("persons") or {}
+    severities = list(config.get("severity_levels") or config.get("severities") or SEVERITIES)
+    routes = {}
+
+    for person, person_config in people.items():
+        person_config = person_config or {}
+        buckets = {}
+        for bucket, devices in (person_config.get("devices") or {}).items():
+            targets = []
+            for device in devices or []:
+                target = parse_device(device)
+                if target is None:
+                    _LOGGER.warning(
+                        "Ignoring device %s for %s, only notify services are supported",
+                        device,
+                        person,
+                    )
+                    continue
+                targets.append(target)
+            buckets[bucket] = tuple(targets)
+
+        for severity in severities:
+            preference = normalize_preference(person_config.get(f"{severity}_notification"))
+            routes[(person, severity)] = Route(preference, buckets)
+
+    return routes
+
+
+def _config_paths(hass: HomeAssistant) -> List[str]:
+    return [
+        hass.config.path(CONFIG_FILE),
+        os.path.join(os.path.dirname(__file__), CONFIG_FILE),
+    ]
+
+
+def _load_config(paths: List[str]) -> Dict[str, Any]:
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                _LOGGER.debug("Loading notification routing from %s", path)
+                return yaml.safe_load(f) or {}
+    _LOGGER.warning("No %s found, notifications will only be logged", CONFIG_FILE)
+    return {}
+
+
+async def async_load_routes(hass: HomeAssistant) -> Dict[Tuple[str, str], Route]:
+    """Read the routing configuration without blocking the event loop."""
+    config = await hass.async_add_executor_job(_load_config, _config_paths(hass))
+    return compile_routes(config)
+
+
+def build_service_data(severity: str, title: str, message: str) -> Dict[str, Any]:
+    """Build the notify service data for a notification."""
+    return {
+        "title": f"[{severity.upper()}] {title}",
+        "message": message,
+        "data": {
+            "priority": "high" if severity == "critical" else "normal",
+            "channel": severity,
+            "ttl": 0 if severity == "critical" else 3600,
+        },
+    }
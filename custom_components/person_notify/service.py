@@ -1,4 +1,5 @@
 """Services for the Person-Based Notification System integration."""
+import asyncio
 import logging
 from typing import Any, Dict
 
@@ -14,9 +15,17 @@ from .const import (
     CONF_SEVERITY,
     CONF_TITLE,
     CONF_MESSAGE,
+    DATA_PREFERENCES,
+    DATA_ROUTES,
+    PREF_LOG_ONLY,
+    PREF_NONE,
+    PREFERENCE_BUCKETS,
     SERVICE_NOTIFY_PERSON,
+    SERVICE_RELOAD,
     SEVERITIES,
 )
+from .preferences import PreferenceIndex
+from .router import async_load_routes, build_service_data
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,6 +40,16 @@ SERVICE_SCHEMA = vol.Schema(
 
 async def async_setup_services(hass: HomeAssistant) -> None:
     """Set up services for the Person-Based Notification System integration."""
+    preferences = PreferenceIndex(hass)
+    hass.data[DOMAIN][DATA_PREFERENCES] = preferences
+
+    async def async_load() -> None:
+        """Load routing and follow the matching preference helpers."""
+        routes = await async_load_routes(hass)
+        hass.data[DOMAIN][DATA_ROUTES] = routes
+        preferences.async_track(routes)
+
+    await async_load()
     
     async def handle_notify_person(call: ServiceCall) -> None:
         """Handle the notify_person service call."""
@@ -38,8 +57,20 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         severity = call.data[CONF_SEVERITY]
         title = call.data[CONF_TITLE]
         message = call.data[CONF_MESSAGE]
+
+        if person.startswith("person."):
+            person = person.split(".", 1)[1]
         
-        # In a full implementation, this would get user preferences and route notifications
+        routes = hass.data[DOMAIN][DATA_ROUTES]
+        route = routes.get((person, severity))
+        
+        # Preference helpers set in the UI override the configuration file
+        preference = preferences.get(person, severity)
+        if preference is None:
+            preference = route.preference if route else PREF_NONE
+        targets = route.buckets.get(PREFERENCE_BUCKETS.get(preference), ()) if route else ()
+        
+        # Always log the notification
         _LOGGER.info(
             "Notification for %s: [%s] %s - %s", 
             person.title(), 
@@ -48,11 +79,45 @@ async def async_setup_services(hass: HomeAssistant) -> None:
             message
         )
         
-        # TODO: Implement the full routing logic based on user preferences
+        # Skip further processing if preference is "None" or "Log Only"
+        if preference in (PREF_NONE, PREF_LOG_ONLY) or not targets:
+            return
+        
+        # Send to every device concurrently without leaving the event loop
+        service_data = build_service_data(severity, title, message)
+        results = await asyncio.gather(
+            *(
+                hass.services.async_call(domain, service, dict(service_data), blocking=True)
+                for domain, service in targets
+            ),
+            return_exceptions=True,
+        )
+        
+        for (domain, service), result in zip(targets, results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(
+                    "Failed to send notification for %s to %s.%s: %s",
+                    person,
+                    domain,
+                    service,
+                    result,
+                )
+            else:
+                _LOGGER.debug("Sent notification for %s to %s.%s", person, domain, service)
+    
+    async def handle_reload(call: ServiceCall) -> None:
+        """Reload the routing configuration."""
+        await async_load()
     
     hass.services.async_register(
         DOMAIN,
         SERVICE_NOTIFY_PERSON,
         handle_notify_person,
         schema=SERVICE_SCHEMA,
-    )
\ No newline at end of file
+    )
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RELOAD,
+        handle_reload,
+    )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The add-on imports its modules flatly, as it does when run from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "addons", "person_notify"))
@@ -0,0 +1,77 @@
+from dedup import DedupStore, make_dedup_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_duplicate_within_ttl():
+    clock = FakeClock()
+    store = DedupStore(ttl=300, clock=clock)
+    assert store.check_and_add("a")
+    clock.now = 299
+    assert not store.check_and_add("a")
+    assert store.stats()["duplicates"] == 1
+
+
+def test_sent_again_after_ttl():
+    clock = FakeClock()
+    store = DedupStore(ttl=300, clock=clock)
+    assert store.check_and_add("a")
+    clock.now = 300
+    assert store.check_and_add("a")
+
+
+def test_expired_entries_are_pruned():
+    clock = FakeClock()
+    store = DedupStore(ttl=300, clock=clock)
+    store.check_and_add("a")
+    clock.now = 100
+    store.check_and_add("b")
+    clock.now = 350
+    store.check_and_add("c")
+    assert len(store) == 2
+    assert store.stats()["expired"] == 1
+    clock.now = 400
+    assert store.stats()["size"] == 1
+
+
+def test_oldest_entries_are_evicted_at_the_cap():
+    clock = FakeClock()
+    store = DedupStore(ttl=300, max_entries=2, clock=clock)
+    for key in ("a", "b", "c"):
+        assert store.check_and_add(key)
+    assert len(store) == 2
+    assert store.stats()["evicted"] == 1
+    # "a" was evicted, so it is no longer a duplicate
+    assert store.check_and_add("a")
+    assert not store.check_and_add("c")
+
+
+def test_discard_allows_a_resend():
+    store = DedupStore(ttl=300, clock=FakeClock())
+    store.check_and_add("a")
+    store.discard("a")
+    assert store.check_and_add("a")
+
+
+def test_key_ignores_audience_order():
+    payload = {"title": "t", "message": "m", "severity": "info", "audience": ["a", "b"]}
+    reordered = dict(payload, audience=["b", "a"])
+    assert make_dedup_key(payload) == make_dedup_key(reordered)
+
+
+def test_key_can_ignore_the_message():
+    payload = {"title": "t", "message": "m", "severity": "info", "audience": ["a"]}
+    changed = dict(payload, message="other")
+    assert make_dedup_key(payload) != make_dedup_key(changed)
+    assert make_dedup_key(payload, ignore_message=True) == make_dedup_key(changed, ignore_message=True)
+
+
+def test_key_per_person():
+    payload = {"title": "t", "message": "m", "severity": "info", "audience": ["a", "b"]}
+    assert make_dedup_key(payload, person="a") != make_dedup_key(payload, person="b")
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from device_health import CLOSED, HALF_OPEN, OPEN, DeviceHealth
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def health(clock):
+    return DeviceHealth(failure_threshold=3, cooldown=60, clock=clock)
+
+
+def state(health, device="notify.phone"):
+    return health.snapshot()[device]["state"]
+
+
+def fail(health, times, device="notify.phone"):
+    for _ in range(times):
+        assert health.allow(device)
+        health.record(device, False, 10.0)
+
+
+def test_unknown_device_is_allowed(health):
+    assert health.allow("notify.phone")
+    assert state(health) == CLOSED
+    assert health.retry_at("notify.phone") is None
+
+
+def test_opens_after_consecutive_failures(health):
+    fail(health, 2)
+    assert state(health) == CLOSED
+    fail(health, 1)
+    assert state(health) == OPEN
+    assert not health.allow("notify.phone")
+    assert health.snapshot()["notify.phone"]["short_circuited"] == 1
+
+
+def test_success_resets_the_consecutive_failures(health):
+    fail(health, 2)
+    health.record("notify.phone", True, 10.0)
+    fail(health, 2)
+    assert state(health) == CLOSED
+
+
+def test_retry_at_is_the_end_of_the_cooldown(health, clock):
+    fail(health, 3)
+    clock.now += 20
+    assert health.retry_at("notify.phone") == pytest.approx(time.time() + 40, abs=1)
+
+
+def test_lets_one_probe_through_after_the_cooldown(health, clock):
+    fail(health, 3)
+    clock.now += 59
+    assert not health.allow("notify.phone")
+    clock.now += 1
+    assert health.allow("notify.phone")
+    assert state(health) == HALF_OPEN
+    # Only one probe at a time, and no retry time while it runs
+    assert not health.allow("notify.phone")
+    assert health.retry_at("notify.phone") is None
+
+
+def test_successful_probe_closes_the_circuit(health, clock):
+    fail(health, 3)
+    clock.now += 60
+    assert health.allow("notify.phone")
+    health.record("notify.phone", True, 10.0)
+    assert state(health) == CLOSED
+    assert health.allow("notify.phone")
+    assert health.snapshot()["notify.phone"]["retry_in"] is None
+
+
+def test_failed_probe_opens_for_another_cooldown(health, clock):
+    fail(health, 3)
+    clock.now += 60
+    fail(health, 1)
+    assert state(health) == OPEN
+    assert health.snapshot()["notify.phone"]["retry_in"] == 60
+    clock.now += 59
+    assert not health.allow("notify.phone")
+
+
+def test_devices_are_tracked_separately(health):
+    fail(health, 3, "notify.laptop")
+    assert health.allow("notify.phone")
+    assert not health.allow("notify.laptop")
+
+
+def test_success_rate_and_latency_are_smoothed(clock):
+    health = DeviceHealth(alpha=0.5, clock=clock)
+    health.record("notify.phone", True, 100.0)
+    health.record("notify.phone", False, 300.0)
+    snapshot = health.snapshot()["notify.phone"]
+    assert snapshot["success_rate"] == 0.5
+    assert snapshot["latency_ms"] == 200.0
+    assert (snapshot["successes"], snapshot["failures"]) == (1, 1)
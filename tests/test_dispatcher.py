@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+from device_health import DeviceHealth
+from dispatcher import DeliveryDispatcher, DeliveryError
+
+
+def delivery(device, severity="info"):
+    return {"person": "alice", "device": device, "severity": severity}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class BlockingSend:
+    """Record calls and hold each one until it is released."""
+
+    def __init__(self):
+        self.order = []
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self._lock = threading.Lock()
+        self._release = {}
+        self._released_all = False
+
+    def __call__(self, delivery):
+        severity = delivery["severity"]
+        with self._lock:
+            self.order.append(delivery["device"])
+            self.in_flight[severity] = self.in_flight.get(severity, 0) + 1
+            self.max_in_flight[severity] = max(self.max_in_flight.get(severity, 0), self.in_flight[severity])
+            event = self._release.setdefault(delivery["device"], threading.Event())
+            if self._released_all:
+                event.set()
+        event.wait(5)
+        with self._lock:
+            self.in_flight[severity] -= 1
+        return True
+
+    def release(self, device=None):
+        with self._lock:
+            if device is None:
+                self._released_all = True
+            devices = [device] if device else list(self._release)
+            for name in devices:
+                self._release.setdefault(name, threading.Event()).set()
+
+
+def dispatch_in_background(dispatcher, deliveries):
+    results = {}
+    thread = threading.Thread(target=lambda: results.update(value=dispatcher.dispatch(deliveries)))
+    thread.start()
+    return thread, results
+
+
+def waiting(dispatcher, severity):
+    return dispatcher.stats()[severity]["waiting"]
+
+
+def test_default_budgets_grow_with_severity():
+    dispatcher = DeliveryDispatcher(lambda d: True, max_workers=6)
+    try:
+        assert [dispatcher.limit(s) for s in ("info", "warning", "critical")] == [2, 4, 6]
+        assert dispatcher.priority("critical") > dispatcher.priority("warning") > dispatcher.priority("info")
+        assert dispatcher.priority("unknown") == -1
+    finally:
+        dispatcher.shutdown()
+
+
+def test_configured_budgets_are_clamped():
+    dispatcher = DeliveryDispatcher(lambda d: True, max_workers=4, severity_limits={"info": 0, "critical": 99})
+    try:
+        assert dispatcher.limit("info") == 1
+        assert dispatcher.limit("critical") == 4
+    finally:
+        dispatcher.shutdown()
+
+
+def test_highest_severity_is_sent_first():
+    send = BlockingSend()
+    dispatcher = DeliveryDispatcher(send, max_workers=1)
+    try:
+        # Occupy the only worker, then queue one delivery of each severity
+        busy, _ = dispatch_in_background(dispatcher, [delivery("busy")])
+        wait_for(lambda: send.order == ["busy"])
+        threads = []
+        for severity in ("info", "warning", "critical"):
+            threads.append(dispatch_in_background(dispatcher, [delivery(severity, severity)])[0])
+            wait_for(lambda: waiting(dispatcher, severity) == 1)
+        send.release()
+        for thread in [busy] + threads:
+            thread.join(5)
+        assert send.order == ["busy", "critical", "warning", "info"]
+    finally:
+        send.release()
+        dispatcher.shutdown()
+
+
+def test_low_severity_burst_leaves_workers_for_critical():
+    send = BlockingSend()
+    dispatcher = DeliveryDispatcher(send, max_workers=3, per_request_limit=8)
+    try:
+        infos = [delivery(f"info-{index}") for index in range(5)]
+        info_thread, _ = dispatch_in_background(dispatcher, infos)
+        # A request never has more than max_workers deliveries submitted
+        wait_for(lambda: waiting(dispatcher, "info") == 2)
+        assert send.in_flight == {"info": 1}
+
+        critical_thread, critical = dispatch_in_background(dispatcher, [delivery("critical", "critical")])
+        send.release("critical")
+        critical_thread.join(5)
+        assert critical["value"][0]["status"] == "sent"
+
+        send.release()
+        info_thread.join(5)
+        assert send.max_in_flight["info"] == 1
+    finally:
+        send.release()
+        dispatcher.shutdown()
+
+
+def test_per_request_limit():
+    send = BlockingSend()
+    dispatcher = DeliveryDispatcher(send, max_workers=8, per_request_limit=2)
+    try:
+        thread, results = dispatch_in_background(
+            dispatcher, [delivery(f"critical-{index}", "critical") for index in range(5)]
+        )
+        wait_for(lambda: len(send.order) == 2)
+        time.sleep(0.05)
+        assert len(send.order) == 2
+        send.release()
+        thread.join(5)
+        assert send.max_in_flight["critical"] == 2
+        assert [result["device"] for result in results["value"]] == [f"critical-{index}" for index in range(5)]
+    finally:
+        send.release()
+        dispatcher.shutdown()
+
+
+def test_results_describe_each_outcome():
+    def send(delivery):
+        if delivery["device"] == "rejected":
+            raise DeliveryError("HTTP 500: boom")
+        if delivery["device"] == "slow":
+            raise DeliveryError("No answer", unconfirmed=True)
+        if delivery["device"] == "broken":
+            raise RuntimeError("bug")
+        return delivery["device"] == "ok"
+
+    dispatcher = DeliveryDispatcher(send, max_workers=2)
+    try:
+        results = dispatcher.dispatch([delivery(device) for device in ("ok", "false", "rejected", "slow", "broken")])
+    finally:
+        dispatcher.shutdown()
+    assert [(result["status"], result.get("error")) for result in results] == [
+        ("sent", None),
+        ("failed", "service call failed"),
+        ("failed", "HTTP 500: boom"),
+        ("unconfirmed", "No answer"),
+        ("failed", "bug"),
+    ]
+
+
+def test_open_circuit_skips_without_sending():
+    calls = []
+    health = DeviceHealth(failure_threshold=1, cooldown=60)
+    dispatcher = DeliveryDispatcher(lambda d: calls.append(d) or False, max_workers=1, health=health)
+    try:
+        first, second = dispatcher.dispatch([delivery("notify.phone")]), dispatcher.dispatch([delivery("notify.phone")])
+    finally:
+        dispatcher.shutdown()
+    assert first[0]["status"] == "failed"
+    assert second[0]["status"] == "skipped"
+    assert second[0]["retry_at"] == pytest.approx(time.time() + 60, abs=1)
+    assert len(calls) == 1
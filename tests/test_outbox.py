@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from outbox import Outbox
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(str(tmp_path / "outbox.db"), lambda deliveries: [], base_delay=5, max_delay=600)
+
+
+def delivery(device="notify.phone", severity="info"):
+    return {"person": "alice", "severity": severity, "device": device}
+
+
+def test_skipped_waits_for_the_circuit_without_using_an_attempt(outbox):
+    result = {"status": "skipped", "retry_at": NOW + 60}
+    assert outbox._schedule("info", 2, result, NOW) == (2, "pending", NOW + 60)
+
+
+def test_skipped_during_a_probe_backs_off_without_using_an_attempt(outbox):
+    attempts, status, next_attempt_at = outbox._schedule("info", 0, {"status": "skipped", "retry_at": None}, NOW)
+    assert (attempts, status) == (0, "pending")
+    assert NOW + 2.5 <= next_attempt_at <= NOW + 5
+
+
+def test_skipped_never_becomes_a_dead_letter(outbox):
+    attempts = 2
+    for _ in range(20):
+        attempts, status, _ = outbox._schedule("info", attempts, {"status": "skipped", "retry_at": NOW}, NOW)
+        assert status == "pending"
+    assert attempts == 2
+
+
+def test_unconfirmed_is_a_dead_letter_straight_away(outbox):
+    assert outbox._schedule("critical", 0, {"status": "unconfirmed"}, NOW) == (1, "dead", NOW)
+
+
+def test_failed_backs_off_exponentially(outbox):
+    attempts, status, next_attempt_at = outbox._schedule("critical", 2, {"status": "failed"}, NOW)
+    assert (attempts, status) == (3, "pending")
+    # Third attempt: base_delay * 2 ** 2 with jitter down to half of it
+    assert NOW + 10 <= next_attempt_at <= NOW + 20
+
+
+def test_backoff_is_capped(outbox):
+    _, _, next_attempt_at = outbox._schedule("critical", 8, {"status": "failed"}, NOW)
+    assert next_attempt_at <= NOW + outbox.max_delay
+
+
+@pytest.mark.parametrize("severity, max_attempts", [("info", 3), ("warning", 5), ("critical", 10)])
+def test_failed_becomes_a_dead_letter_after_max_attempts(outbox, severity, max_attempts):
+    assert outbox._schedule(severity, max_attempts - 2, {"status": "failed"}, NOW)[1] == "pending"
+    assert outbox._schedule(severity, max_attempts - 1, {"status": "failed"}, NOW)[:2] == (max_attempts, "dead")
+
+
+def test_unknown_severity_uses_the_info_limit(outbox):
+    assert outbox._schedule("debug", 2, {"status": "failed"}, NOW)[1] == "dead"
+
+
+def test_max_attempts_can_be_overridden(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), lambda deliveries: [], max_attempts={"info": 1})
+    assert outbox._schedule("info", 0, {"status": "failed"}, NOW)[1] == "dead"
+
+
+def test_add_stores_all_entries_with_their_cause(outbox):
+    ids = outbox.add([
+        (delivery("notify.phone"), {"status": "failed", "error": "HTTP 500: boom"}),
+        (delivery("notify.laptop"), {"status": "unconfirmed", "error": "No answer"}),
+        (delivery("notify.tablet"), {"status": "skipped", "error": "circuit open", "retry_at": time.time() + 60}),
+    ])
+    assert len(ids) == 3
+    entries = {entry["device"]: entry for entry in outbox.entries()}
+    assert (entries["notify.phone"]["status"], entries["notify.phone"]["attempts"]) == ("pending", 1)
+    assert entries["notify.phone"]["last_error"] == "HTTP 500: boom"
+    assert (entries["notify.laptop"]["status"], entries["notify.laptop"]["attempts"]) == ("dead", 1)
+    assert (entries["notify.tablet"]["status"], entries["notify.tablet"]["attempts"]) == ("pending", 0)
+    assert outbox.stats()["pending"] == 2
+    assert outbox.stats()["dead"] == 1
+
+
+def test_add_nothing(outbox):
+    assert outbox.add([]) == []
+
+
+def test_requeue_and_delete_dead_letters(outbox):
+    dead, pending = outbox.add([
+        (delivery("notify.laptop"), {"status": "unconfirmed", "error": "No answer"}),
+        (delivery("notify.phone"), {"status": "failed", "error": "HTTP 500"}),
+    ])
+    assert not outbox.requeue(pending)
+    assert outbox.delete(dead)
+    assert not outbox.delete(dead)
+
+
+def test_due_deliveries_are_retried_until_sent(tmp_path):
+    calls = []
+
+    def dispatch(deliveries):
+        calls.append([d["device"] for d in deliveries])
+        status = "sent" if len(calls) > 1 else "failed"
+        return [{"status": status, "error": "HTTP 500"} for _ in deliveries]
+
+    outbox = Outbox(str(tmp_path / "outbox.db"), dispatch, base_delay=0.02)
+    outbox.add([(delivery(severity="critical"), {"status": "failed", "error": "HTTP 500"})])
+    deadline = time.monotonic() + 5
+    while outbox.stats()["recovered"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert calls == [["notify.phone"], ["notify.phone"]]
+    assert outbox.entries() == []
+    assert outbox.stats()["retried"] == 2